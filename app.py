@@ -3,42 +3,39 @@ import pandas as pd
 from dotenv import load_dotenv
 
 import os
-from supabase import create_client, Client
 
 load_dotenv()
 
-# --- Initialize Supabase ---
-@st.cache_resource
-def init_supabase() -> Client:
-    url: str = os.environ.get("SUPABASE_URL", "")
-    key: str = os.environ.get("SUPABASE_KEY", "")
-    if not url or not key:
-        return None
-    return create_client(url, key)
-
-supabase = init_supabase()
+# --- Initialize Supabase Auth ---
+# One pooled client for every session; each user's tokens live in their own session state
+from core.auth import get_auth_client
+auth_client = get_auth_client()
 
 # --- Initialize Session State ---
 if 'authenticated' not in st.session_state:
     st.session_state.authenticated = False
 if 'user_email' not in st.session_state:
     st.session_state.user_email = None
+if 'session_id' not in st.session_state:
+    # Streamlit has no public session id; background jobs are keyed by this one
+    import uuid
+    st.session_state.session_id = uuid.uuid4().hex
 st.set_page_config(page_title="Quoter", page_icon="📝", layout="wide")
 
 import base64
 
-def get_base64_of_bin_file(bin_file):
-    with open(bin_file, 'rb') as f:
-        data = f.read()
-    return base64.b64encode(data).decode()
-
-# --- Login / Register UI ---
-if not st.session_state.authenticated:
+@st.cache_data(show_spinner=False)
+def login_page_style():
+    """
+    Builds the login page <style> block, background image included, once per process
+    instead of on every rerun of the login screen.
+    """
+    from core.assets import asset_data_uri
     try:
-        bg_image = get_base64_of_bin_file("static/images/login_bg.png")
+        bg_image = asset_data_uri("images/login_bg.png")
         bg_css = f"""
         .stApp {{
-            background-image: linear-gradient(rgba(255, 255, 255, 0.6), rgba(255, 255, 255, 0.8)), url("data:image/png;base64,{bg_image}");
+            background-image: linear-gradient(rgba(255, 255, 255, 0.6), rgba(255, 255, 255, 0.8)), url("{bg_image}");
             background-size: cover;
             background-position: center;
             background-attachment: fixed;
@@ -53,7 +50,7 @@ if not st.session_state.authenticated:
         }
         """
 
-    st.markdown(f"""
+    return f"""
         <style>
         {bg_css}
         
@@ -145,7 +142,18 @@ if not st.session_state.authenticated:
             border-radius: 8px;
         }}
         </style>
-    """, unsafe_allow_html=True)
+    """
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def prepare_uploaded_logo(file_id, _data):
+    # Keyed by the upload's id, so the same logo is only downscaled and encoded once
+    from core.profiles import prepare_logo
+    logo_bytes, logo_mime = prepare_logo(_data)
+    return logo_bytes, logo_mime, base64.b64encode(logo_bytes).decode()
+
+# --- Login / Register UI ---
+if not st.session_state.authenticated:
+    st.markdown(login_page_style(), unsafe_allow_html=True)
 
     # Use columns to narrow the form width and center it
     _, col_center, _ = st.columns([1, 2, 1])
@@ -154,10 +162,13 @@ if not st.session_state.authenticated:
         st.markdown('<p class="login-title">Quot<span class="title-accent">er</span></p>', unsafe_allow_html=True)
         st.markdown('<p class="login-subtitle">Simplify your pricing workflow.</p>', unsafe_allow_html=True)
         
+        if st.session_state.pop("session_expired", False):
+            st.warning("Your session has expired. Please log in again.")
+        
         with st.container(border=True):
             auth_mode = st.radio("Select Action", ["Login", "Register"], horizontal=True, label_visibility="collapsed")
             
-            if not supabase:
+            if not auth_client:
                 st.error("Supabase credentials are not configured properly. Please check your .env file.")
                 st.stop()
                 
@@ -173,15 +184,16 @@ if not st.session_state.authenticated:
                         st.error("Please provide both email and password.")
                     elif auth_mode == "Login":
                         try:
-                            res = supabase.auth.sign_in_with_password({"email": email, "password": password})
+                            auth_session = auth_client.sign_in(email, password)
+                            st.session_state.auth_session = auth_session
                             st.session_state.authenticated = True
-                            st.session_state.user_email = res.user.email
+                            st.session_state.user_email = auth_session.email or email
                             st.rerun()
                         except Exception as e:
                             st.error(f"Login failed: {e}")
                     elif auth_mode == "Register":
                         try:
-                            res = supabase.auth.sign_up({"email": email, "password": password})
+                            auth_client.sign_up(email, password)
                             st.success("Registration successful! You can now log in.")
                         except Exception as e:
                             st.error(f"Registration failed: {e}")
@@ -189,21 +201,58 @@ if not st.session_state.authenticated:
     st.stop() # Stop rendering the rest of the app if not authenticated
 
 # --- Authenticated View ---
+# The access token is checked locally on every run and refreshed in the background before it expires
+try:
+    claims = auth_client.validate(st.session_state.get("auth_session")) if auth_client is not None else None
+except ValueError as e:
+    # Misconfiguration, not an expired session: sending the user back to login wouldn't help
+    st.error(f"Authentication is not configured correctly: {e}")
+    st.stop()
+if claims is None:
+    st.session_state.authenticated = False
+    st.session_state.auth_session = None
+    st.session_state.session_expired = True
+    st.rerun()
+
 st.sidebar.markdown(f"**Logged in as:**<br>{st.session_state.user_email}", unsafe_allow_html=True)
+from core.store import get_artifact_store
+artifact_store = get_artifact_store()
+artifact_store.touch(st.session_state.session_id)
+
+def clear_quote_artifacts():
+    # Generated files live in the artifact store; session state only holds their handles
+    artifacts = st.session_state.get("quote_artifacts")
+    if artifacts is not None:
+        artifacts.discard()
+    st.session_state.quote_artifacts = None
+
 if st.sidebar.button("Logout"):
-    supabase.auth.sign_out()
+    auth_client.sign_out(st.session_state.auth_session)
+    st.session_state.auth_session = None
+    from core.jobs import get_job_manager
+    get_job_manager().discard_session(st.session_state.session_id)
+    artifact_store.discard_session(st.session_state.session_id)
+    clear_quote_artifacts()
+    st.session_state.company_profiles = None
     st.session_state.authenticated = False
     st.session_state.user_email = None
     st.rerun()
 
+from core.cache import get_extraction_cache, get_document_cache
+cache_stats = get_extraction_cache().stats()
+st.sidebar.caption(f"Extraction cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['entries']} stored)")
+document_stats = get_document_cache().stats()
+st.sidebar.caption(f"Document cache: {document_stats['hit_rate']:.0%} hit rate ({document_stats['memory_entries']} in memory, {document_stats['disk_entries']} on disk)")
+
 st.title("Quoter: Markup Generator")
 st.write("Upload a retailer quotation to apply markup and generate client-ready files.")
 
 # --- Mode Selection ---
 st.header("Input Method")
-input_mode = st.radio("How would you like to provide the quotation data?", ["Upload Existing Quote", "Manual Data Entry"], horizontal=True)
+input_mode = st.radio("How would you like to provide the quotation data?", ["Upload Existing Quote", "Manual Data Entry", "Batch Process Quotes"], horizontal=True)
 
 uploaded_file = None
+batch_files = []
 proceed = False
 file_type = None
 
@@ -220,6 +269,19 @@ if input_mode == "Upload Existing Quote":
         st.info(f"File uploaded successfully: {uploaded_file.name}")
     else:
         st.info("Please upload a file to begin.")
+elif input_mode == "Batch Process Quotes":
+    batch_files = st.file_uploader(
+        "Upload Retailer Quotations", 
+        type=["pdf", "xlsx"],
+        accept_multiple_files=True,
+        help="Accepts any number of .pdf or .xlsx files. Each one is marked up with the same configuration."
+    )
+    if batch_files:
+        proceed = True
+        file_type = "batch"
+        st.info(f"{len(batch_files)} files uploaded successfully.")
+    else:
+        st.info("Please upload one or more files to begin.")
 else:
     proceed = True
     file_type = "manual"
@@ -227,6 +289,16 @@ else:
 if proceed:
     # --- Input Fields Section ---
     st.header("Configuration")
+    
+    # Saved company profiles are read once per session and prefill the fields below
+    from core.profiles import get_profile_store
+    profile_store = get_profile_store()
+    if st.session_state.get("company_profiles") is None:
+        st.session_state.company_profiles = profile_store.load_all(st.session_state.user_email)
+    profile_names = list(st.session_state.company_profiles)
+    selected_profile = st.selectbox("Company Profile", ["(None)"] + profile_names, help="Prefill sender details, pricing defaults and logo from a saved profile.")
+    profile = st.session_state.company_profiles.get(selected_profile, {})
+    
     col1, col2 = st.columns(2)
     
     with col1:
@@ -234,7 +306,7 @@ if proceed:
         markup_percentage = st.number_input(
             "Markup Percentage (%)", 
             min_value=0.0, 
-            value=10.0, 
+            value=float(profile.get("markup_percentage", 10.0)), 
             step=1.0, 
             help="Enter the markup percentage to apply (e.g., 20 for 20%)."
         )
@@ -243,16 +315,16 @@ if proceed:
         discount_flat = st.number_input(
             "Discount (Flat $ Amount)", 
             min_value=0.0, 
-            value=0.0, 
+            value=float(profile.get("discount_flat", 0.0)), 
             step=10.0, 
             help="Enter a flat dollar amount to discount before tax."
         )
-        tax_type = st.radio("Sales Tax Type", ["Percentage (%)", "Flat Amount ($)"], horizontal=True)
+        tax_type = st.radio("Sales Tax Type", ["Percentage (%)", "Flat Amount ($)"], index=1 if profile.get("tax_type") == "flat" else 0, horizontal=True)
         if tax_type == "Percentage (%)":
             sales_tax_percentage = st.number_input(
                 "Sales Tax (%)", 
                 min_value=0.0, 
-                value=0.0, 
+                value=float(profile.get("sales_tax_percentage", 0.0)), 
                 step=0.1, 
                 help="Applied after markup and discount."
             )
@@ -261,7 +333,7 @@ if proceed:
             sales_tax_flat = st.number_input(
                 "Sales Tax ($)", 
                 min_value=0.0, 
-                value=0.0, 
+                value=float(profile.get("sales_tax_flat", 0.0)), 
                 step=10.0, 
                 help="Flat tax amount applied after markup and discount."
             )
@@ -269,10 +341,10 @@ if proceed:
         
         st.subheader("Sender Details")
         uploaded_logo = st.file_uploader("Company Logo (Optional)", type=["png", "jpg", "jpeg"])
-        sender_name = st.text_input("Sender Company Name", value="My Company LLC")
-        sender_email = st.text_input("Sender Email", value="sales@mycompany.com")
-        sender_phone = st.text_input("Sender Phone", placeholder="+1 (555) 123-4567")
-        sender_address = st.text_area("Sender Address", height=68, placeholder="123 Main St\nCity, State ZIP")
+        sender_name = st.text_input("Sender Company Name", value=profile.get("sender_name", "My Company LLC"))
+        sender_email = st.text_input("Sender Email", value=profile.get("sender_email", "sales@mycompany.com"))
+        sender_phone = st.text_input("Sender Phone", value=profile.get("sender_phone", ""), placeholder="+1 (555) 123-4567")
+        sender_address = st.text_area("Sender Address", value=profile.get("sender_address", ""), height=68, placeholder="123 Main St\nCity, State ZIP")
         
     with col2:
         st.subheader("Recipient Details")
@@ -282,10 +354,78 @@ if proceed:
         
     st.subheader("Job Details")
     job_description = st.text_area("Job Description / Notes", help="Add any context or description about this quotation.")
-    signature_name = st.text_input("Signed By:", placeholder="John Doe", help="Name to appear in the signature block of the PDF.")
+    signature_name = st.text_input("Signed By:", value=profile.get("signature_name", ""), placeholder="John Doe", help="Name to appear in the signature block of the PDF.")
+
+    # An uploaded logo wins over the profile's; both are already downscaled for the template
+    logo_bytes = None
+    logo_base64 = profile.get("logo_base64")
+    logo_mime = profile.get("logo_mime", "image/png")
+    if uploaded_logo:
+        try:
+            logo_bytes, logo_mime, logo_base64 = prepare_uploaded_logo(uploaded_logo.file_id, uploaded_logo.getvalue())
+        except Exception as e:
+            # Same fallback as the PDF template: embed the upload as it is
+            st.warning(f"The logo could not be optimised and will be used as uploaded: {e}")
+            logo_bytes = uploaded_logo.getvalue()
+            logo_mime = uploaded_logo.type or "image/png"
+            logo_base64 = base64.b64encode(logo_bytes).decode()
+        if len(logo_bytes) < uploaded_logo.size:
+            st.caption(f"Logo optimised for the PDF: {uploaded_logo.size / 1024:,.0f} KB → {len(logo_bytes) / 1024:,.0f} KB")
+
+    config = {
+        "logo_base64": logo_base64,
+        "logo_mime": logo_mime,
+        "sender_name": sender_name,
+        "sender_email": sender_email,
+        "sender_phone": sender_phone,
+        "sender_address": sender_address,
+        "recipient_name": recipient_name,
+        "recipient_contact": recipient_contact,
+        "recipient_address": recipient_address,
+        "job_description": job_description,
+        "discount_flat": discount_flat,
+        "tax_type": "percentage" if tax_type == "Percentage (%)" else "flat",
+        "sales_tax_percentage": sales_tax_percentage,
+        "sales_tax_flat": sales_tax_flat,
+        "signature_name": signature_name
+    }
+    
+    with st.expander("Save as Company Profile"):
+        new_profile_name = st.text_input("Profile Name", value="" if selected_profile == "(None)" else selected_profile)
+        if st.button("Save Profile"):
+            try:
+                if logo_bytes is None and logo_base64:
+                    logo_bytes = base64.b64decode(logo_base64)
+                profile_store.save(st.session_state.user_email, new_profile_name,
+                                   dict(config, markup_percentage=markup_percentage), logo_bytes, logo_mime)
+                st.session_state.company_profiles = profile_store.load_all(st.session_state.user_email)
+                st.success(f"Saved profile '{new_profile_name.strip()}'.")
+            except Exception as e:
+                st.error(f"Could not save the profile: {e}")
     
     st.markdown("---")
     
+    # --- Batch Mode ---
+    if input_mode == "Batch Process Quotes":
+        st.subheader("Process Batch")
+        batch_workers = st.number_input("Parallel Workers", min_value=1, max_value=16, value=4, step=1, help="How many quotations to process at the same time.")
+        if st.button("Process All Quotations", type="primary"):
+            from core.batch import run_batch
+            with st.spinner(f"Processing {len(batch_files)} quotations..."):
+                zip_bytes, report = run_batch([(f.name, f.getvalue()) for f in batch_files], config, markup_percentage, max_workers=int(batch_workers))
+            st.session_state.batch_zip = zip_bytes
+            st.session_state.batch_report = report
+            
+        if st.session_state.get("batch_report"):
+            failures = sum(1 for r in st.session_state.batch_report if r["status"] != "ok")
+            if failures:
+                st.warning(f"{failures} of {len(st.session_state.batch_report)} files failed. See the report below.")
+            else:
+                st.success(f"All {len(st.session_state.batch_report)} files processed successfully!")
+            st.dataframe(pd.DataFrame(st.session_state.batch_report), use_container_width=True)
+            st.download_button("Download All Outputs (ZIP)", data=st.session_state.batch_zip, file_name="Quotations_MarkedUp.zip", mime="application/zip")
+        st.stop()
+    
     # Reset session state if a new file is uploaded or mode switched
     if input_mode == "Upload Existing Quote":
         if "current_file" not in st.session_state or st.session_state.current_file != uploaded_file.name:
@@ -293,45 +433,70 @@ if proceed:
             st.session_state.extracted_tables = None
             st.session_state.is_pdf = (file_type == 'pdf')
             st.session_state.is_manual = False
-            st.session_state.generated_pdf = None
-            st.session_state.generated_excel = None
+            clear_quote_artifacts()
     elif input_mode == "Manual Data Entry":
         if "is_manual" not in st.session_state or not st.session_state.is_manual:
             st.session_state.is_manual = True
             st.session_state.is_pdf = False
             # Initialize an empty DataFrame for manual entry with standard columns
             st.session_state.extracted_tables = [pd.DataFrame([{"Description": "", "Quantity": 1, "Unit Price": 0.0, "Total": 0.0}])]
-            st.session_state.generated_pdf = None
-            st.session_state.generated_excel = None
+            clear_quote_artifacts()
         
     # --- Step 1: Extract Data ---
     if st.session_state.is_pdf and st.session_state.extracted_tables is None:
-        if st.button("Step 1: Extract Data from PDF"):
-            with st.spinner("Analyzing PDF semantics..."):
-                from core.extractor import extract_pdf_data
-                try:
-                    tables = extract_pdf_data(uploaded_file.getvalue())
-                    if not tables:
-                        st.warning("No tabular data could be found in this PDF.")
+        from core.jobs import get_job_manager, DONE, FAILED
+        job_manager = get_job_manager()
+        pdf_bytes = uploaded_file.getvalue()
+        extraction_job = job_manager.get(st.session_state.session_id, pdf_bytes)
+        
+        # Messages left behind by a job that finished on a previous run
+        if st.session_state.get("extraction_error"):
+            st.error(f"Extraction failed: {st.session_state.pop('extraction_error')}")
+        if st.session_state.pop("extraction_empty", False):
+            st.warning("No tabular data could be found in this PDF.")
+        
+        if extraction_job is None:
+            if st.button("Step 1: Extract Data from PDF"):
+                force_refresh = st.session_state.pop("force_refresh_extraction", False)
+                job_manager.submit(st.session_state.session_id, pdf_bytes, uploaded_file.name, force_refresh=force_refresh)
+                st.rerun()
+        else:
+            # Poll the background job in a fragment so the rest of the page stays interactive
+            @st.fragment(run_every=1)
+            def show_extraction_progress(job):
+                if job.status == FAILED or job.status == DONE:
+                    job_manager.discard(job)
+                    if job.status == FAILED:
+                        st.session_state.extraction_error = job.error
+                    elif not job.result():
+                        st.session_state.extraction_empty = True
                     else:
-                        st.session_state.extracted_tables = tables
+                        st.session_state.extracted_tables = job.result()
                         # Reset generated files when extracting new data
-                        st.session_state.generated_pdf = None
-                        st.session_state.generated_excel = None
-                        st.rerun()
-                except Exception as e:
-                    st.error(f"Extraction failed: {e}")
+                        clear_quote_artifacts()
+                    st.rerun()
+                    
+                st.info(f"Analyzing PDF semantics... {job.rows_extracted} rows extracted so far.")
+                # Show rows as they arrive instead of waiting for the whole document
+                partial = job.partial_table()
+                if partial is not None:
+                    st.dataframe(partial, use_container_width=True)
+                    
+            show_extraction_progress(extraction_job)
 
     # --- Step 2: Edit and Generate ---
     if file_type == "xlsx" and not st.session_state.get("is_manual", False):
         # Excel workflow (Direct Process)
         if st.button("Generate Marked-up Excel", type="primary"):
-            from core.extractor import extract_excel_data
             from core.processor import apply_markup_to_excel
             try:
-                wb = extract_excel_data(uploaded_file.getvalue())
-                marked_up_bytes = apply_markup_to_excel(wb, markup_percentage)
-                st.success("Excel processed successfully!")
+                marked_up_bytes, touched_ranges = apply_markup_to_excel(uploaded_file.getvalue(), markup_percentage)
+                if touched_ranges:
+                    st.success(f"Excel processed successfully! Marked up {len(touched_ranges)} range(s).")
+                    with st.expander("Marked-up ranges"):
+                        st.write(", ".join(touched_ranges))
+                else:
+                    st.warning("No Price/Total/Cost/Amount columns with numeric values were found; the workbook is unchanged.")
                 file_name_out = f"MarkedUp_{uploaded_file.name}" if uploaded_file else "Quotation_MarkedUp.xlsx"
                 st.download_button("Download Marked-up Excel", data=marked_up_bytes, file_name=file_name_out)
             except Exception as e:
@@ -352,6 +517,8 @@ if proceed:
             with col_head2:
                 if st.button("🔄 Retry Extraction", help="If the data looks wrong, click here to extract it again.", use_container_width=True):
                     st.session_state.extracted_tables = None
+                    # Bypass the extraction cache so the retry actually re-queries Gemini
+                    st.session_state.force_refresh_extraction = True
                     st.rerun()
             st.write("You can edit the cells below directly. Ensure numeric columns are clean (e.g., '100.50' instead of '$100.50').")
             
@@ -362,168 +529,87 @@ if proceed:
                 edited_df = st.data_editor(df, num_rows="dynamic", key=f"editor_{idx}", use_container_width=True)
                 edited_tables.append(edited_df)
                 
+            # Live totals: each engine only recalculates the rows the editor reports as changed
+            from core.totals import IncrementalTotals, live_quote_totals
+            from core.quote import currency_options, format_money
+            engines = st.session_state.get("totals_engines") or []
+            if len(engines) != len(st.session_state.extracted_tables) or any(
+                engine.source is not df for engine, df in zip(engines, st.session_state.extracted_tables)
+            ):
+                engines = [IncrementalTotals(df, markup_percentage) for df in st.session_state.extracted_tables]
+                st.session_state.totals_engines = engines
+            for idx, engine in enumerate(engines):
+                engine.apply_delta(st.session_state.get(f"editor_{idx}"), markup_percentage)
+            live_totals = live_quote_totals(engines, config, markup_percentage)
+            
+            def money(value):
+                return format_money([value], **currency_options(config))[0]
+            
+            totals_cols = st.columns(4)
+            totals_cols[0].metric("Subtotal", money(live_totals["calc_subtotal"]))
+            totals_cols[1].metric(f"Markup ({markup_percentage:g}%)", money(live_totals["calc_markup"]))
+            totals_cols[2].metric("Tax", money(live_totals["calc_tax"]))
+            totals_cols[3].metric("Grand Total", money(live_totals["calc_grand_total"]))
+                
             st.markdown("---")
-            btn_label = "Step 2: Generate Final Quotations" if st.session_state.get("is_manual", False) else "Step 3: Generate Final Quotations"
-            if st.button(btn_label, type="primary"):
-                with st.spinner("Applying markup and generating files..."):
-                    from core.processor import apply_markup_to_data
-                    from core.generator import generate_final_pdf, generate_excel_from_pdf
-                    import pandas as pd
-                    
-                    logo_base64 = None
-                    logo_mime = "image/png"
-                    if uploaded_logo:
-                        # Extract base64 dynamically from uploaded file
-                        import base64
-                        logo_base64 = base64.b64encode(uploaded_logo.getvalue()).decode()
-                        logo_mime = uploaded_logo.type
-
-                    config = {
-                        "logo_base64": logo_base64,
-                        "logo_mime": logo_mime,
-                        "sender_name": sender_name,
-                        "sender_email": sender_email,
-                        "sender_phone": sender_phone,
-                        "sender_address": sender_address,
-                        "recipient_name": recipient_name,
-                        "recipient_contact": recipient_contact,
-                        "recipient_address": recipient_address,
-                        "job_description": job_description,
-                        "discount_flat": discount_flat,
-                        "tax_type": "percentage" if tax_type == "Percentage (%)" else "flat",
-                        "sales_tax_percentage": sales_tax_percentage,
-                        "sales_tax_flat": sales_tax_flat,
-                        "signature_name": signature_name
-                    }
-                    
-                    try:
-                        # 1. Normalize columns and calculate row totals
-                        normalized_tables = []
-                        for df in edited_tables:
-                            norm_df = df.copy()
-                            rename_map = {}
-                            cols_to_keep = []
-                            for c in norm_df.columns:
-                                cl = str(c).lower()
-                                if 'total' in cl or 'amount' in cl: rename_map[c] = 'Total'
-                                elif 'price' in cl or 'unit' in cl or 'cost' in cl: rename_map[c] = 'Unit Price'
-                                elif 'qty' in cl or 'quant' in cl: rename_map[c] = 'Quantity'
-                                elif 'desc' in cl or 'item' in cl: rename_map[c] = 'Description'
-                                
-                                if c in rename_map: cols_to_keep.append(c)
-                                
-                            if not cols_to_keep:
-                                cols_to_keep = list(norm_df.columns)
-                                
-                            norm_df = norm_df[cols_to_keep]
-                            norm_df.rename(columns=rename_map, inplace=True)
-                            
-                            # Drop duplicated column names
-                            if len(norm_df.columns) != len(set(norm_df.columns)):
-                                norm_df = norm_df.loc[:, ~norm_df.columns.duplicated()]
-                                
-                            # Reorder columns natively
-                            final_order = [c for c in ["Description", "Quantity", "Unit Price", "Total"] if c in norm_df.columns]
-                            if final_order:
-                                norm_df = norm_df[final_order + [c for c in norm_df.columns if c not in final_order]]
-                                
-                            # Calculate Total dynamically
-                            if "Quantity" in norm_df.columns and "Unit Price" in norm_df.columns:
-                                q_clean = norm_df["Quantity"].astype(str).str.replace(r'[^\d\.\-]', '', regex=True)
-                                p_clean = norm_df["Unit Price"].astype(str).str.replace(r'[^\d\.\-]', '', regex=True)
-                                q = pd.to_numeric(q_clean, errors='coerce').fillna(1)
-                                p = pd.to_numeric(p_clean, errors='coerce').fillna(0)
-                                calc_total = q * p
-                                
-                                if "Total" in norm_df.columns:
-                                    user_clean = norm_df["Total"].astype(str).str.replace(r'[^\d\.\-]', '', regex=True)
-                                    user_total = pd.to_numeric(user_clean, errors='coerce').fillna(0)
-                                    norm_df["Total"] = calc_total.where(calc_total != 0, user_total)
-                                else:
-                                    norm_df["Total"] = calc_total
-                                    
-                            normalized_tables.append(norm_df)
-                                    
-                        # 2. Apply markup
-                        marked_up_tables = apply_markup_to_data(normalized_tables, markup_percentage)
-                        
-                        # 3. Finalize for PDF
-                        clean_tables = []
-                        for mt in marked_up_tables:
-                            clean_mt = mt.copy()
-                            clean_mt = clean_mt.fillna("")
-                            clean_tables.append(clean_mt)
-                            
-                        # Calculate Subtotal over all CLEANED tables using the guaranteed "Total" column
-                        subtotal = 0.0
-                        for mt in clean_tables:
-                            if not mt.empty and "Total" in mt.columns:
-                                try:
-                                    # Safely stringify to remove currency symbols before summing
-                                    clean_col = mt["Total"].astype(str).str.replace(r'[^\d\.\-]', '', regex=True)
-                                    total_val = pd.to_numeric(clean_col, errors='coerce').fillna(0).sum()
-                                    subtotal += total_val
-                                except Exception as sum_e:
-                                    print(f"Summing error on Total column:", sum_e)
-                            
-                        running_total = subtotal
-                        discount_val = discount_flat
-                        running_total -= discount_val
-                        if running_total < 0: running_total = 0.0
-                        
-                        tax_amount = 0.0
-                        if tax_type == "Percentage (%)" and sales_tax_percentage > 0:
-                            tax_amount = running_total * (sales_tax_percentage / 100.0)
-                        elif tax_type == "Flat Amount ($)" and sales_tax_flat > 0:
-                            tax_amount = sales_tax_flat
-                            
-                        running_total += tax_amount
-                        grand_total = running_total
-                        
-                        markup_amount = 0.0
-                        if markup_percentage > 0:
-                            multiplier = 1 + (markup_percentage / 100.0)
-                            base_subtotal = subtotal / multiplier
-                            markup_amount = subtotal - base_subtotal
-                        
-                        config["calc_subtotal"] = subtotal
-                        config["calc_discount"] = discount_val
-                        config["calc_tax"] = tax_amount
-                        config["calc_markup"] = markup_amount
-                        config["calc_grand_total"] = grand_total
-                        config["sales_tax_percentage"] = sales_tax_percentage
-                        config["tax_type"] = tax_type
-                        config["markup_percentage"] = markup_percentage
+            step_label = "Step 2: Generate Final Quotations" if st.session_state.get("is_manual", False) else "Step 3: Generate Final Quotations"
+            st.subheader(step_label)
+            
+            # Each document is only rendered when asked for, and kept until the quote changes
+            from core.artifacts import QuoteArtifacts, quote_fingerprint, PDF, EXCEL
+            quote_key = quote_fingerprint(edited_tables, config, markup_percentage)
+            artifacts = st.session_state.get("quote_artifacts")
+            if artifacts is None or artifacts.key != quote_key or not artifacts.usable():
+                clear_quote_artifacts()
+                artifacts = QuoteArtifacts(edited_tables, config, markup_percentage, key=quote_key,
+                                           store=artifact_store, session_id=st.session_state.session_id)
+                st.session_state.quote_artifacts = artifacts
+            
+            # Each document is rendered when its download button is clicked (Streamlit calls
+            # data on click, outside the script run) and then read back from the store
+            def both_documents():
+                # The two documents are rendered side by side on a small thread pool
+                from io import BytesIO
+                from zipfile import ZipFile, ZIP_DEFLATED
+                documents = artifacts.build((PDF, EXCEL))
+                buf = BytesIO()
+                with ZipFile(buf, "w", ZIP_DEFLATED) as zf:
+                    zf.writestr("Quotation_MarkedUp.pdf", documents[PDF])
+                    zf.writestr("Quotation_MarkedUp.xlsx", documents[EXCEL])
+                return buf.getvalue()
 
-                        # Use the specifically filtered tables instead of raw edited
-                        pdf_bytes = generate_final_pdf(clean_tables, config)
-                        excel_from_pdf_bytes = generate_excel_from_pdf(edited_tables, config, markup_percentage)
-                        
-                        # Store generated files in session state so downloading one doesn't erase the other
-                        st.session_state.generated_pdf = pdf_bytes
-                        st.session_state.generated_excel = excel_from_pdf_bytes
-                        st.success("Files generated successfully!")
+            colA, colB, colC = st.columns(3)
+            with colA:
+                st.download_button("Download Resulting PDF", data=artifacts.pdf, file_name="Quotation_MarkedUp.pdf", mime="application/pdf", use_container_width=True)
+                if artifacts.is_built(PDF):
+                    st.caption(f"PDF size: {artifacts.sizes[PDF] / 1024:,.0f} KB")
+            with colB:
+                st.download_button("Download Resulting Excel (with Formulas)", data=artifacts.excel, file_name="Quotation_MarkedUp.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", use_container_width=True)
+            with colC:
+                st.download_button("Download Both (ZIP)", data=both_documents, file_name="Quotation_MarkedUp.zip", mime="application/zip", type="primary", use_container_width=True)
                         
+            # --- Step 3: PDF Preview ---
+            st.markdown("---")
+            st.subheader("Step 3: Preview Final PDF")
+            show_preview = artifacts.is_built(PDF)
+            if not show_preview and st.button("Preview PDF"):
+                with st.spinner("Applying markup and generating the PDF..."):
+                    try:
+                        artifacts.pdf()
+                        show_preview = True
                     except Exception as e:
                         st.error(f"File generation failed: {e}")
-                        
-            # Always show download buttons if files exist in session state
-            # (Indent fixed so this block only shows if show_editor is True, or if button was clicked)
-            if st.session_state.get("generated_pdf") or st.session_state.get("generated_excel"):
-                colA, colB = st.columns(2)
-                with colA:
-                    if st.session_state.get("generated_pdf"):
-                        st.download_button("Download Resulting PDF", data=st.session_state.generated_pdf, file_name="Quotation_MarkedUp.pdf", mime="application/pdf")
-                with colB:
-                    if st.session_state.get("generated_excel"):
-                        st.download_button("Download Resulting Excel (with Formulas)", data=st.session_state.generated_excel, file_name="Quotation_MarkedUp.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-                        
-                # --- Step 3: PDF Preview ---
-                if st.session_state.get("generated_pdf"):
-                    st.markdown("---")
-                    st.subheader("Step 3: Preview Final PDF")
-                    import base64
-                    base64_pdf = base64.b64encode(st.session_state.generated_pdf).decode('utf-8')
-                    pdf_display = f'<iframe src="data:application/pdf;base64,{base64_pdf}" width="600" height="600" type="application/pdf"></iframe>'
-                    st.markdown(pdf_display, unsafe_allow_html=True)
+            if show_preview:
+                # Page thumbnails are rendered once per document and served as media files,
+                # so reruns don't resend the PDF itself
+                from core.preview import pdf_preview
+                try:
+                    page_images, page_count = pdf_preview(artifacts.digests[PDF], artifacts.pdf)
+                except Exception as e:
+                    st.warning(f"Preview unavailable: {e}")
+                else:
+                    for page_number, page_image in enumerate(page_images, start=1):
+                        st.image(page_image, caption=f"Page {page_number} of {page_count}", width=600)
+                    if page_count > len(page_images):
+                        st.caption(f"Showing the first {len(page_images)} of {page_count} pages. Download the PDF to see the full quotation.")
         
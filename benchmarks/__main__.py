@@ -0,0 +1,12 @@
+import importlib
+import sys
+
+# Runs the named benchmarks, or all of them: python -m benchmarks [name ...]
+BENCHMARKS = ("currency", "normalize", "template", "renderer", "pdf_size")
+
+for name in sys.argv[1:] or BENCHMARKS:
+    if name not in BENCHMARKS:
+        raise ValueError(f"Unknown benchmark '{name}'. Expected one of: {', '.join(BENCHMARKS)}")
+    print(f"== {name}")
+    importlib.import_module(f"benchmarks.{name}").main()
+    print()
@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.timing import Report, best_of
+from core.quote import format_currency, format_money, to_cents
+
+# Currency formatting of a marked-up money column.
+# "lambda" is the previous per-element Series.apply(f"${x:,.2f}"); "money" is the
+# vectorized formatter starting from float amounts, "cents" from the integer cents
+# the quote pipeline already holds.
+# Run with: python -m benchmarks.currency
+
+
+def main():
+    rng = np.random.default_rng(0)
+    report = Report(("rows", 9, "d"), ("lambda ms", 10, ".1f"), ("money ms", 9, ".1f"),
+                    ("cents ms", 9, ".1f"), ("speedup", 7, ""))
+    for n in (1_000, 100_000, 1_000_000):
+        amounts = pd.Series(np.round(rng.uniform(0, 250_000, n), 2))
+        amounts[::50] = np.nan
+        cents = to_cents(amounts)
+
+        lambda_ms = best_of(lambda: amounts.apply(lambda x: f"${x:,.2f}" if not pd.isna(x) else None))
+        money_ms = best_of(lambda: format_money(amounts))
+        cents_ms = best_of(lambda: format_currency(cents))
+        report.row(n, lambda_ms, money_ms, cents_ms, f"{lambda_ms / money_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
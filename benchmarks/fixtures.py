@@ -0,0 +1,25 @@
+import pandas as pd
+
+# Quote settings shared by the rendering benchmarks
+QUOTE_CONFIG = {
+    "sender_name": "My Company LLC",
+    "sender_email": "sales@mycompany.com",
+    "sender_address": "123 Main St\nCity, State ZIP",
+    "recipient_name": "Client Co",
+    "recipient_address": "456 Client St\nCity, State ZIP",
+    "job_description": "Benchmark job",
+    "calc_subtotal": 1000.0,
+    "calc_tax": 50.0,
+    "calc_grand_total": 1050.0,
+    "sales_tax_percentage": 5.0,
+    "tax_type": "percentage",
+}
+
+
+def line_items(n):
+    return pd.DataFrame({
+        "Description": [f"Item {i} <with markup chars & such>" for i in range(n)],
+        "Quantity": [i % 7 + 1 for i in range(n)],
+        "Unit Price": [f"${i * 1.25:,.2f}" for i in range(n)],
+        "Total": [f"${(i % 7 + 1) * i * 1.25:,.2f}" for i in range(n)],
+    })
@@ -0,0 +1,70 @@
+import random
+
+import pandas as pd
+
+from benchmarks.timing import Report, best_of
+from core.normalize import header_plan
+from core.processor import prepare_quote
+
+# Normalize + markup + subtotal over large synthetic quotes.
+# "legacy" mirrors the previous pipeline, which regex-cleaned the same money column
+# up to four times per generate; "current" is prepare_quote plus formatting the
+# tables for display, which now only happens at render time.
+# Run with: python -m benchmarks.normalize
+
+MONEY = r'[^\d\.\-]'
+
+
+def legacy_prepare(tables, markup_percentage):
+    multiplier = 1 + (markup_percentage / 100)
+    subtotal = 0.0
+    out = []
+    for df in tables:
+        rename_map = {}
+        for c in df.columns:
+            cl = str(c).lower()
+            if 'total' in cl or 'amount' in cl: rename_map[c] = 'Total'
+            elif 'price' in cl or 'unit' in cl or 'cost' in cl: rename_map[c] = 'Unit Price'
+            elif 'qty' in cl or 'quant' in cl: rename_map[c] = 'Quantity'
+            elif 'desc' in cl or 'item' in cl: rename_map[c] = 'Description'
+        norm = df[list(rename_map)].rename(columns=rename_map)
+        q = pd.to_numeric(norm["Quantity"].astype(str).str.replace(MONEY, '', regex=True), errors='coerce').fillna(1)
+        p = pd.to_numeric(norm["Unit Price"].astype(str).str.replace(MONEY, '', regex=True), errors='coerce').fillna(0)
+        user_total = pd.to_numeric(norm["Total"].astype(str).str.replace(MONEY, '', regex=True), errors='coerce').fillna(0)
+        calc_total = q * p
+        norm["Total"] = calc_total.where(calc_total != 0, user_total)
+        for col in ("Unit Price", "Total"):
+            numeric = pd.to_numeric(norm[col].astype(str).str.replace(MONEY, '', regex=True), errors='coerce')
+            norm[col] = (numeric * multiplier).apply(lambda x: f"${x:,.2f}" if not pd.isna(x) else None).combine_first(norm[col])
+        subtotal += pd.to_numeric(norm["Total"].astype(str).str.replace(MONEY, '', regex=True), errors='coerce').fillna(0).sum()
+        out.append(norm.fillna(""))
+    return out, subtotal
+
+
+def current_prepare(tables, markup_percentage):
+    quote_tables, config = prepare_quote(tables, {}, markup_percentage)
+    return [qt.display_frame() for qt in quote_tables], config["calc_subtotal"]
+
+
+def make_table(n):
+    rng = random.Random(n)
+    return pd.DataFrame({
+        "Item Description": [f"Item {i}" for i in range(n)],
+        "Qty": [str(rng.randint(1, 20)) for _ in range(n)],
+        "Unit Price": [f"${rng.uniform(1, 900):,.2f}" for _ in range(n)],
+        "Total Price": [f"${rng.uniform(1, 9000):,.2f}" for _ in range(n)],
+    })
+
+
+def main():
+    report = Report(("line items", 10, "d"), ("legacy ms", 10, ".1f"), ("current ms", 10, ".1f"), ("speedup", 7, ""))
+    for n in (1000, 10000, 100000):
+        tables = [make_table(n)]
+        legacy_ms = best_of(lambda: legacy_prepare(tables, 15))
+        current_ms = best_of(lambda: current_prepare(tables, 15))
+        report.row(n, legacy_ms, current_ms, f"{legacy_ms / current_ms:.1f}x")
+    print("header plan cache:", header_plan.cache_info())
+
+
+if __name__ == "__main__":
+    main()
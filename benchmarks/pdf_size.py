@@ -0,0 +1,41 @@
+import base64
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from benchmarks.fixtures import QUOTE_CONFIG
+from benchmarks.timing import Report, timed
+from core.generator import QuoteRenderer, build_quote_model
+
+# PDF size with a photo logo, embedded as uploaded vs resampled and re-encoded.
+# "before" embeds the original upload and turns WeasyPrint's image options off,
+# "after" is what generate_final_pdf produces.
+# Run with: python -m benchmarks.pdf_size
+
+RAW_OPTIONS = {"optimize_images": False, "jpeg_quality": None, "dpi": None}
+
+
+def main():
+    renderer = QuoteRenderer()
+    rng = np.random.default_rng(0)
+    report = Report(("logo", 11, ""), ("upload KB", 9, ".0f"), ("before KB", 9, ".0f"), ("after KB", 9, ".0f"),
+                    ("saved", 6, ""), ("after ms", 8, ".1f"))
+    for width, height in ((400, 200), (1600, 900), (4000, 3000)):
+        # Noise compresses badly, like a photo
+        pixels = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+        buf = BytesIO()
+        Image.fromarray(pixels).save(buf, format="JPEG", quality=95)
+        logo_base64 = base64.b64encode(buf.getvalue()).decode()
+
+        model = build_quote_model([], dict(QUOTE_CONFIG, logo_base64=logo_base64, logo_mime="image/jpeg"))
+        raw_model = dict(model, logo_src=f"data:image/jpeg;base64,{logo_base64}")
+
+        before = renderer.render(raw_model, **RAW_OPTIONS)
+        after, after_ms = timed(lambda: renderer.render(model))
+        report.row(f"{width}x{height}", buf.tell() / 1024, len(before) / 1024, len(after) / 1024,
+                   f"{(1 - len(after) / len(before)) * 100:.0f}%", after_ms)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+from benchmarks.fixtures import QUOTE_CONFIG, line_items
+from benchmarks.timing import Report, best_of
+from core.generator import QuoteRenderer, build_quote_model
+
+# Cold vs warm WeasyPrint renders of the same quotation.
+# Cold builds a new QuoteRenderer (stylesheet parse + font loading) for every PDF,
+# warm reuses one renderer the way generate_final_pdf does.
+# Run with: python -m benchmarks.renderer
+
+
+def main():
+    warm_renderer = QuoteRenderer()
+    report = Report(("line items", 10, "d"), ("cold ms", 9, ".1f"), ("warm ms", 9, ".1f"), ("saved", 6, ""))
+    for n in (10, 100, 1000):
+        model = build_quote_model([line_items(n)], QUOTE_CONFIG)
+        warm_renderer.render(model)
+
+        cold_ms = best_of(lambda: QuoteRenderer().render(model))
+        warm_ms = best_of(lambda: warm_renderer.render(model))
+        report.row(n, cold_ms, warm_ms, f"{(1 - warm_ms / cold_ms) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
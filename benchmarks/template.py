@@ -0,0 +1,25 @@
+from benchmarks.fixtures import QUOTE_CONFIG, line_items
+from benchmarks.timing import Report, best_of
+from core.generator import build_quote_model, render_quote_html
+
+# Micro-benchmark for the quotation HTML template (WeasyPrint layout time is excluded).
+# Run with: python -m benchmarks.template
+
+
+def main():
+    # Warm the template cache so the first row measures steady-state rendering
+    render_quote_html(build_quote_model([line_items(1)], QUOTE_CONFIG))
+
+    report = Report(("line items", 10, "d"), ("model ms", 9, ".2f"), ("render ms", 9, ".2f"), ("to_html ms", 10, ".2f"))
+    for n in (10, 1000, 10000):
+        df = line_items(n)
+        model = build_quote_model([df], QUOTE_CONFIG)
+        model_ms = best_of(lambda: build_quote_model([df], QUOTE_CONFIG), repeat=5)
+        render_ms = best_of(lambda: render_quote_html(model), repeat=5)
+        # The previous implementation's per-table cost, for comparison
+        to_html_ms = best_of(lambda: df.to_html(index=False, classes='dataframe'), repeat=5)
+        report.row(n, model_ms, render_ms, to_html_ms)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import time
+
+
+def best_of(fn, repeat=3):
+    """
+    Runs fn repeat times. Returns: the fastest run in milliseconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def timed(fn):
+    """
+    Runs fn once. Returns: (result, elapsed milliseconds).
+    """
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+class Report:
+    """
+    Prints benchmark results as a right-aligned table.
+    columns are (heading, width, format spec) tuples, e.g. ("rows", 9, "d") or
+    ("legacy ms", 10, ".1f"); cells that are already strings are printed as they are.
+    """
+
+    def __init__(self, *columns):
+        self.columns = columns
+        print("  ".join(f"{heading:>{width}}" for heading, width, _ in columns))
+
+    def row(self, *cells):
+        parts = []
+        for cell, (_, width, spec) in zip(cells, self.columns):
+            text = cell if isinstance(cell, str) else format(cell, spec)
+            parts.append(f"{text:>{width}}")
+        print("  ".join(parts))
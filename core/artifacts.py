@@ -0,0 +1,221 @@
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pandas as pd
+
+from core.quote import QuoteTable
+
+PDF = "pdf"
+EXCEL = "excel"
+ARTIFACT_KINDS = (PDF, EXCEL)
+
+
+def _hash_frame(h, df):
+    h.update(json.dumps([str(c) for c in df.columns]).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df.astype(str), index=False).to_numpy().tobytes())
+    h.update(b"\0")
+
+
+def _hash_config(h, config):
+    h.update(json.dumps(config, sort_keys=True, default=str).encode("utf-8"))
+
+
+def quote_fingerprint(tables, config, markup_percentage):
+    """
+    Stable hash of everything a generated document depends on: the edited tables
+    (headers and cell values), the quote settings and the markup.
+    """
+    h = hashlib.sha256()
+    for df in tables:
+        _hash_frame(h, df)
+    _hash_config(h, config)
+    h.update(repr(float(markup_percentage)).encode("utf-8"))
+    return h.hexdigest()
+
+
+def document_key(kind, tables, config, day=None):
+    """
+    Cache key for one rendered document: the document type, the tables exactly as
+    the renderer receives them (QuoteTables from prepare_quote are hashed by their
+    cells and cents) and the quote settings. The documents print today's date, so
+    the key is bucketed by day; re-rendering the same quote tomorrow is a miss.
+    """
+    h = hashlib.sha256(kind.encode("utf-8"))
+    for table in tables:
+        if isinstance(table, QuoteTable):
+            _hash_frame(h, table.frame)
+            for col, cents in table.cents.items():
+                h.update(str(col).encode("utf-8"))
+                h.update(cents.to_numpy(dtype="int64", na_value=-1).tobytes())
+                h.update(cents.isna().tobytes())
+        else:
+            _hash_frame(h, table)
+    _hash_config(h, config)
+    h.update((day or date.today()).isoformat().encode("utf-8"))
+    return h.hexdigest()
+
+
+class QuoteArtifacts:
+    """
+    The PDF and Excel documents for one version of a quote, each built the first
+    time it is asked for and then kept. key is the quote_fingerprint of the inputs,
+    so callers can hold on to one instance for as long as the key doesn't change.
+    Building is thread-safe; each document is built at most once.
+    Rendered documents also go through the process-wide DocumentCache (pass
+    cache=False to skip it), so identical quotes in any session share one render.
+    With a store (a SessionArtifactStore) and session_id, built documents are kept
+    in the store and only their handles are held here; a document the store has
+    since evicted is simply built again.
+    The input tables are not copied, so callers must not modify them afterwards.
+    Once every document has been built and is in the DocumentCache, they and the
+    prepared quote are released; a document the store evicts after that is read back
+    from the cache. usable() turns False once the store has evicted a document, and
+    the caller should start over with a new instance.
+    """
+
+    def __init__(self, tables, config, markup_percentage, key=None, cache=None, store=None, session_id=None):
+        self.tables = list(tables)
+        self.config = dict(config)
+        self.markup_percentage = markup_percentage
+        self.key = key or quote_fingerprint(self.tables, self.config, markup_percentage)
+        self.cache = cache
+        self.store = store
+        self.session_id = session_id
+        self.timings = {}
+        self.cache_hits = set()
+        self.digests = {}
+        self.sizes = {}
+        self._results = {}
+        self._cache_keys = {}
+        self._quote = None
+        self._quote_lock = threading.Lock()
+        self._locks = {kind: threading.Lock() for kind in ARTIFACT_KINDS}
+
+    def quote(self):
+        """
+        Returns (quote_tables, quote_config) from prepare_quote, computed once.
+        """
+        with self._quote_lock:
+            if self._quote is None:
+                from core.processor import prepare_quote
+                self._quote = prepare_quote(self.tables, self.config, self.markup_percentage)
+            return self._quote
+
+    def _document_cache(self):
+        if self.cache is False:
+            return None
+        if self.cache is None:
+            from core.cache import get_document_cache
+            self.cache = get_document_cache()
+        return self.cache
+
+    def _render(self, kind):
+        quote_tables, quote_config = self.quote()
+        # The PDF is rendered from the prepared tables, the Excel export from the edited ones
+        source = quote_tables if kind == PDF else self.tables
+        cache = self._document_cache()
+        cache_key = document_key(kind, source, quote_config) if cache is not None else None
+        if cache is not None:
+            self._cache_keys[kind] = cache_key
+            data = cache.get(cache_key)
+            if data is not None:
+                self.cache_hits.add(kind)
+                return data
+
+        # WeasyPrint needs native libraries, so only load it when a document is built
+        from core.generator import generate_final_pdf, generate_excel_from_pdf
+
+        if kind == PDF:
+            data = generate_final_pdf(quote_tables, quote_config)
+            if data is None:
+                raise ValueError("PDF rendering failed.")
+        else:
+            data = generate_excel_from_pdf(self.tables, quote_config, self.markup_percentage)
+        if cache is not None:
+            cache.set(cache_key, data)
+        return data
+
+    def _keep(self, kind, data):
+        self.digests[kind] = hashlib.sha256(data).hexdigest()
+        self.sizes[kind] = len(data)
+        if self.store is not None:
+            data = self.store.put(self.session_id, data, name=kind)
+        self._results[kind] = data
+        if all(k in self._results and k in self._cache_keys for k in ARTIFACT_KINDS):
+            # Nothing is left to render, and the cache can stand in for the store, so
+            # the inputs need not be held any longer
+            with self._quote_lock:
+                self.tables = None
+                self._quote = None
+
+    def _load(self, kind):
+        kept = self._results.get(kind)
+        if kept is None or self.store is None:
+            return kept
+        return self.store.get(kept)
+
+    def is_built(self, kind):
+        kept = self._results.get(kind)
+        if kept is None or self.store is None:
+            return kept is not None
+        return self.store.has(kept)
+
+    def usable(self):
+        """
+        True while every document can still be returned: either it is kept, or the
+        inputs to build it again are.
+        """
+        return self.tables is not None or all(self.is_built(kind) for kind in ARTIFACT_KINDS)
+
+    def discard(self):
+        """
+        Releases the stored documents, e.g. when the quote is replaced.
+        """
+        if self.store is not None:
+            for handle in self._results.values():
+                self.store.discard(handle)
+        self._results.clear()
+
+    def get(self, kind):
+        """
+        Returns the bytes of one document, building it on first use.
+        """
+        if kind not in ARTIFACT_KINDS:
+            raise ValueError(f"Unknown document type '{kind}'. Expected one of: {', '.join(ARTIFACT_KINDS)}")
+        with self._locks[kind]:
+            data = self._load(kind)
+            if data is None:
+                if self.tables is None:
+                    # Evicted from the store after the inputs were released. Download
+                    # buttons call this outside the script run, so fall back to the cache
+                    data = self._document_cache().get(self._cache_keys[kind])
+                    if data is None:
+                        raise ValueError("The document is no longer available. Please create it again.")
+                    self._keep(kind, data)
+                    return data
+                start = time.perf_counter()
+                data = self._render(kind)
+                self._keep(kind, data)
+                self.timings[kind] = time.perf_counter() - start
+            return data
+
+    def pdf(self):
+        return self.get(PDF)
+
+    def excel(self):
+        return self.get(EXCEL)
+
+    def build(self, kinds=ARTIFACT_KINDS, max_workers=2):
+        """
+        Builds the requested documents, concurrently when more than one still needs
+        building. Returns: {kind: bytes}.
+        """
+        pending = [kind for kind in kinds if not self.is_built(kind)]
+        if len(pending) > 1 and max_workers > 1:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as pool:
+                list(pool.map(self.get, pending))
+        return {kind: self.get(kind) for kind in kinds}
@@ -0,0 +1,58 @@
+import base64
+import mimetypes
+import os
+import threading
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+
+# URLs with this scheme are resolved against STATIC_DIR instead of the network
+ASSET_SCHEME = "quoter-asset:"
+
+mimetypes.add_type("font/woff2", ".woff2")
+mimetypes.add_type("font/woff", ".woff")
+
+_assets = {}
+_assets_lock = threading.Lock()
+
+
+def asset_url(relative_path):
+    return f"{ASSET_SCHEME}{relative_path}"
+
+
+def load_asset(relative_path):
+    """
+    Returns (data, mime_type) for a bundled file under static/, reading it from disk
+    only the first time it is requested in this process.
+    """
+    with _assets_lock:
+        cached = _assets.get(relative_path)
+    if cached is not None:
+        return cached
+
+    path = os.path.normpath(os.path.join(STATIC_DIR, relative_path))
+    if os.path.commonpath([path, STATIC_DIR]) != STATIC_DIR:
+        raise ValueError(f"Asset path escapes the static directory: {relative_path}")
+    with open(path, "rb") as f:
+        data = f.read()
+    asset = (data, mimetypes.guess_type(path)[0] or "application/octet-stream")
+
+    with _assets_lock:
+        _assets[relative_path] = asset
+    return asset
+
+
+_data_uris = {}
+
+
+def asset_data_uri(relative_path):
+    """
+    Returns a bundled file as a data: URI, base64-encoding it only once per process.
+    """
+    with _assets_lock:
+        uri = _data_uris.get(relative_path)
+    if uri is None:
+        data, mime_type = load_asset(relative_path)
+        uri = f"data:{mime_type};base64,{base64.b64encode(data).decode()}"
+        with _assets_lock:
+            _data_uris[relative_path] = uri
+    return uri
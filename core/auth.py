@@ -0,0 +1,245 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import jwt
+
+DEFAULT_TIMEOUT_SECONDS = float(os.environ.get("SUPABASE_TIMEOUT_SECONDS", "10"))
+
+# Sessions are refreshed in the background once their access token is this close to expiring
+DEFAULT_REFRESH_MARGIN_SECONDS = 300
+DEFAULT_JWKS_TTL_SECONDS = 600
+# An unknown key id forces a JWKS refetch, but no more often than this
+DEFAULT_JWKS_REFETCH_SECONDS = 60
+
+# Tokens issued by Supabase Auth for signed-in users carry this audience
+JWT_AUDIENCE = "authenticated"
+
+
+class AuthSession:
+    """
+    One user's Supabase Auth tokens, kept in st.session_state. A background refresh
+    replaces the tokens in place, so holders of the object always see the latest ones.
+    """
+
+    def __init__(self, access_token, refresh_token, expires_at, user_id=None, email=None):
+        self.access_token = access_token
+        self.refresh_token = refresh_token
+        self.expires_at = expires_at
+        self.user_id = user_id
+        self.email = email
+        self.refreshing = None
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_response(cls, payload):
+        user = payload.get("user") or {}
+        expires_at = payload.get("expires_at") or time.time() + payload.get("expires_in", 3600)
+        return cls(payload["access_token"], payload["refresh_token"], float(expires_at), user.get("id"), user.get("email"))
+
+    def update(self, other):
+        with self.lock:
+            self.access_token = other.access_token
+            self.refresh_token = other.refresh_token
+            self.expires_at = other.expires_at
+            self.user_id = other.user_id or self.user_id
+            self.email = other.email or self.email
+
+
+class SupabaseAuth:
+    """
+    Talks to the Supabase Auth REST API over one pooled httpx client and validates
+    access tokens locally, so checking a session on every script run costs no round trip.
+    Tokens signed with the project's JWT secret (HS256, no key id) are verified with
+    jwt_secret; tokens signed with an asymmetric key are verified with the signing keys
+    from the JWKS endpoint, cached for jwks_ttl seconds.
+    Pass transport (e.g. httpx.MockTransport) or point url at a local fake server in tests.
+    """
+
+    def __init__(self, url, api_key, jwt_secret=None, timeout=DEFAULT_TIMEOUT_SECONDS,
+                 refresh_margin=DEFAULT_REFRESH_MARGIN_SECONDS, jwks_ttl=DEFAULT_JWKS_TTL_SECONDS,
+                 jwks_refetch_interval=DEFAULT_JWKS_REFETCH_SECONDS, transport=None, max_connections=20):
+        self.base_url = url.rstrip("/") + "/auth/v1"
+        self.jwt_secret = jwt_secret
+        self.refresh_margin = refresh_margin
+        self.jwks_ttl = jwks_ttl
+        self.jwks_refetch_interval = jwks_refetch_interval
+        self.refreshes = 0
+        self._http = httpx.Client(
+            base_url=self.base_url,
+            headers={"apikey": api_key},
+            timeout=timeout,
+            transport=transport,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self._keys = {}
+        self._keys_fetched_at = 0.0
+        self._keys_lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="quoter-auth")
+
+    def _post(self, path, json, params=None, token=None):
+        headers = {"Authorization": f"Bearer {token}"} if token else None
+        response = self._http.post(path, json=json, params=params, headers=headers)
+        if response.status_code >= 400:
+            try:
+                body = response.json()
+            except ValueError:
+                body = {}
+            message = body.get("error_description") or body.get("msg") or body.get("message") or response.text
+            raise ValueError(message or f"Auth request failed with status {response.status_code}")
+        return response.json() if response.content else {}
+
+    def sign_in(self, email, password):
+        """
+        Signs in with email and password. Returns: an AuthSession.
+        """
+        payload = self._post("/token", {"email": email, "password": password}, params={"grant_type": "password"})
+        return AuthSession.from_response(payload)
+
+    def sign_up(self, email, password):
+        return self._post("/signup", {"email": email, "password": password})
+
+    def refresh(self, session):
+        """
+        Exchanges the session's refresh token for new tokens and updates it in place.
+        """
+        payload = self._post("/token", {"refresh_token": session.refresh_token}, params={"grant_type": "refresh_token"})
+        session.update(AuthSession.from_response(payload))
+        self.refreshes += 1
+        return session
+
+    def sign_out(self, session):
+        """
+        Revokes the session on the server without making the caller wait for it.
+        """
+        def revoke():
+            try:
+                self._post("/logout", None, token=session.access_token)
+            except Exception as e:
+                print(f"Sign-out request failed: {e}")
+
+        self._refresher.submit(revoke)
+
+    def _signing_keys(self, force=False):
+        with self._keys_lock:
+            age = time.time() - self._keys_fetched_at
+            if age > self.jwks_ttl or (force and age > self.jwks_refetch_interval):
+                try:
+                    response = self._http.get("/.well-known/jwks.json")
+                    response.raise_for_status()
+                except httpx.HTTPError as e:
+                    if not self._keys:
+                        raise
+                    # Keep serving the cached keys and try again after jwks_refetch_interval
+                    print(f"Could not refresh signing keys, using cached ones: {e}")
+                    self._keys_fetched_at = time.time() - self.jwks_ttl + self.jwks_refetch_interval
+                    return self._keys
+                self._keys = {jwk.get("kid"): jwt.PyJWK(jwk) for jwk in response.json().get("keys", [])}
+                self._keys_fetched_at = time.time()
+            return self._keys
+
+    def verify(self, access_token):
+        """
+        Checks an access token's signature, expiry and audience without calling the server.
+        Returns: the token's claims. Raises jwt.InvalidTokenError if it isn't valid,
+        httpx.HTTPError if the signing keys can't be fetched and none are cached,
+        and ValueError if it is signed with the JWT secret but none is configured.
+        """
+        header = jwt.get_unverified_header(access_token)
+        kid = header.get("kid")
+        if kid is None or header.get("alg") == "HS256":
+            # Projects on the legacy JWT secret publish no signing keys at all
+            if not self.jwt_secret:
+                raise ValueError("Access tokens are signed with the project's JWT secret; set SUPABASE_JWT_SECRET.")
+            return jwt.decode(access_token, self.jwt_secret, algorithms=["HS256"], audience=JWT_AUDIENCE)
+
+        keys = self._signing_keys()
+        if kid not in keys:
+            # Signing keys were rotated since the last fetch
+            keys = self._signing_keys(force=True)
+        if kid not in keys:
+            raise jwt.InvalidTokenError(f"Unknown signing key '{kid}'")
+        key = keys[kid]
+        return jwt.decode(access_token, key.key, algorithms=[key.algorithm_name], audience=JWT_AUDIENCE)
+
+    def _refresh_in_background(self, session):
+        def run():
+            try:
+                self.refresh(session)
+            except Exception as e:
+                print(f"Background token refresh failed: {e}")
+            finally:
+                session.refreshing = None
+
+        with session.lock:
+            if session.refreshing is None:
+                session.refreshing = self._refresher.submit(run)
+
+    def validate(self, session):
+        """
+        Returns the claims of the session's access token, or None if the session is
+        no longer usable. Tokens close to expiry are refreshed in the background; an
+        already expired token is refreshed on the spot.
+        """
+        if session is None:
+            return None
+        remaining = session.expires_at - time.time()
+        if remaining <= 0:
+            pending = session.refreshing
+            try:
+                if pending is not None:
+                    pending.result(timeout=self._http.timeout.read)
+                if session.expires_at <= time.time():
+                    self.refresh(session)
+            except Exception as e:
+                print(f"Session refresh failed: {e}")
+                return None
+        elif remaining < self.refresh_margin:
+            self._refresh_in_background(session)
+
+        try:
+            return self.verify(session.access_token)
+        except jwt.InvalidTokenError as e:
+            print(f"Rejected access token: {e}")
+            return None
+        except httpx.HTTPError as e:
+            print(f"Could not fetch signing keys: {e}")
+            return None
+
+
+_auth_client = None
+_auth_client_lock = threading.Lock()
+
+
+def get_auth_client():
+    """
+    Returns the process-wide auth client, or None if Supabase isn't configured.
+    """
+    global _auth_client
+    with _auth_client_lock:
+        if _auth_client is None:
+            url = os.environ.get("SUPABASE_URL", "")
+            key = os.environ.get("SUPABASE_KEY", "")
+            if not url or not key:
+                return None
+            _auth_client = SupabaseAuth(url, key, jwt_secret=os.environ.get("SUPABASE_JWT_SECRET") or None)
+        return _auth_client
+
+
+def configure_auth_client(**kwargs):
+    """
+    Replaces the process-wide auth client, e.g. with one pointed at a fake server in tests.
+    Returns the new client.
+    """
+    global _auth_client
+    with _auth_client_lock:
+        _auth_client = SupabaseAuth(**kwargs)
+        return _auth_client
+
+
+def reset_auth_client():
+    global _auth_client
+    with _auth_client_lock:
+        _auth_client = None
@@ -0,0 +1,186 @@
+"""
+Batch processing of many supplier quotations with one configuration.
+
+Usage (headless):
+    python -m core.batch quotes/ --markup 15 --output marked_up.zip --config company.json
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from dotenv import load_dotenv
+
+SUPPORTED_EXTENSIONS = ("pdf", "xlsx")
+
+
+def process_quote_file(name, file_bytes, config, markup_percentage):
+    """
+    Runs the full pipeline for a single quotation file.
+    Returns: (outputs, timings) where outputs is a list of (file_name, bytes) and
+    timings maps each pipeline stage to its duration in seconds.
+    """
+    from core.extractor import extract_pdf_data
+    from core.processor import apply_markup_to_excel, prepare_quote
+
+    stem, ext = os.path.splitext(os.path.basename(name))
+    ext = ext.lower().lstrip(".")
+    timings = {}
+    outputs = []
+
+    start = time.perf_counter()
+    if ext == "xlsx":
+        # Reading and marking up the workbook is a single streaming pass
+        xlsx_bytes, touched_ranges = apply_markup_to_excel(file_bytes, markup_percentage)
+        timings["markup"] = time.perf_counter() - start
+        if not touched_ranges:
+            raise ValueError("No Price/Total/Cost/Amount columns with numeric values were found.")
+        outputs.append((f"MarkedUp_{stem}.xlsx", xlsx_bytes))
+        return outputs, timings
+
+    if ext != "pdf":
+        raise ValueError(f"Unsupported file type: .{ext}")
+    # WeasyPrint needs native libraries, so only load it when a PDF is actually produced
+    from core.generator import generate_final_pdf, generate_excel_from_pdf
+
+    tables = extract_pdf_data(file_bytes)
+    timings["extract"] = time.perf_counter() - start
+    if not tables:
+        raise ValueError("No tabular data could be found in this PDF.")
+
+    start = time.perf_counter()
+    quote_tables, quote_config = prepare_quote(tables, config, markup_percentage)
+    timings["markup"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pdf_bytes = generate_final_pdf(quote_tables, quote_config)
+    timings["pdf"] = time.perf_counter() - start
+    if pdf_bytes is None:
+        raise ValueError("PDF rendering failed.")
+    outputs.append((f"Quotation_{stem}.pdf", pdf_bytes))
+
+    start = time.perf_counter()
+    outputs.append((f"Quotation_{stem}.xlsx", generate_excel_from_pdf(tables, quote_config, markup_percentage)))
+    timings["excel"] = time.perf_counter() - start
+    return outputs, timings
+
+
+def _process_for_report(name, file_bytes, config, markup_percentage):
+    # Never let one bad file take the whole batch down; failures become report rows
+    start = time.perf_counter()
+    try:
+        outputs, timings = process_quote_file(name, file_bytes, config, markup_percentage)
+        status, error = "ok", ""
+    except Exception as e:
+        outputs, timings = [], {}
+        status, error = "failed", str(e)
+    return outputs, {
+        "file": name,
+        "status": status,
+        "error": error,
+        "outputs": ", ".join(out_name for out_name, _ in outputs),
+        "extract_s": round(timings.get("extract", 0.0), 3),
+        "markup_s": round(timings.get("markup", 0.0), 3),
+        "pdf_s": round(timings.get("pdf", 0.0), 3),
+        "excel_s": round(timings.get("excel", 0.0), 3),
+        "total_s": round(time.perf_counter() - start, 3),
+    }
+
+
+def run_batch(files, config, markup_percentage, max_workers=4, use_processes=False):
+    """
+    Processes many quotation files concurrently.
+    files is an iterable of (file_name, file_bytes). Threads suit the network-bound
+    Gemini extraction; use_processes=True spreads CPU-bound PDF rendering over cores.
+    Returns: (zip_bytes, report) where the ZIP holds every output plus report.csv and
+    report is a list of per-file dicts with status, error and stage timings.
+    """
+    files = list(files)
+    executor_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with executor_cls(max_workers=max(1, min(max_workers, len(files) or 1))) as pool:
+        futures = [pool.submit(_process_for_report, name, data, config, markup_percentage) for name, data in files]
+        results = [future.result() for future in futures]
+
+    report = [row for _, row in results]
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        used_names = set()
+        for outputs, _ in results:
+            for out_name, data in outputs:
+                # Two suppliers can send files with the same name
+                unique_name, n = out_name, 1
+                while unique_name in used_names:
+                    n += 1
+                    stem, ext = os.path.splitext(out_name)
+                    unique_name = f"{stem}_{n}{ext}"
+                used_names.add(unique_name)
+                zf.writestr(unique_name, data)
+        zf.writestr("report.csv", _report_csv(report))
+    return buf.getvalue(), report
+
+
+def _report_csv(report):
+    out = io.StringIO()
+    if report:
+        writer = csv.DictWriter(out, fieldnames=list(report[0].keys()))
+        writer.writeheader()
+        writer.writerows(report)
+    return out.getvalue()
+
+
+def _collect_inputs(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            names = sorted(os.listdir(path))
+            candidates = [os.path.join(path, n) for n in names]
+        else:
+            candidates = [path]
+        for candidate in candidates:
+            if os.path.isfile(candidate) and candidate.lower().rsplit(".", 1)[-1] in SUPPORTED_EXTENSIONS:
+                with open(candidate, "rb") as f:
+                    files.append((os.path.basename(candidate), f.read()))
+    return files
+
+
+def main(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Apply markup to a folder of supplier quotations.")
+    parser.add_argument("inputs", nargs="+", help="PDF/XLSX files or folders containing them.")
+    parser.add_argument("--markup", type=float, default=10.0, help="Markup percentage (default: 10).")
+    parser.add_argument("--output", default="Quotations_MarkedUp.zip", help="Path of the ZIP to write.")
+    parser.add_argument("--config", help="JSON file with sender/recipient details, discount and tax settings.")
+    parser.add_argument("--workers", type=int, default=4, help="Number of files processed in parallel.")
+    parser.add_argument("--processes", action="store_true", help="Use worker processes instead of threads.")
+    args = parser.parse_args(argv)
+
+    config = {}
+    if args.config:
+        with open(args.config, encoding="utf-8") as f:
+            config = json.load(f)
+
+    files = _collect_inputs(args.inputs)
+    if not files:
+        print("No .pdf or .xlsx files found.", file=sys.stderr)
+        return 1
+
+    start = time.perf_counter()
+    zip_bytes, report = run_batch(files, config, args.markup, max_workers=args.workers, use_processes=args.processes)
+    with open(args.output, "wb") as f:
+        f.write(zip_bytes)
+
+    for row in report:
+        line = f"{row['status']:>6}  {row['total_s']:>8.2f}s  {row['file']}"
+        print(line + (f"  ({row['error']})" if row["error"] else ""))
+    failures = sum(1 for row in report if row["status"] != "ok")
+    print(f"{len(report) - failures}/{len(report)} files processed in {time.perf_counter() - start:.2f}s -> {args.output}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,290 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_CACHE_DIR = os.environ.get("QUOTER_CACHE_DIR", os.path.join(".tmp", "cache"))
+
+
+class ExtractionCache:
+    """
+    Persistent, content-addressed cache for PDF extraction results.
+    Entries are keyed by a hash of the PDF bytes plus the model and prompt used,
+    so changing either automatically invalidates older results.
+    """
+
+    def __init__(self, path=None, max_entries=500, max_bytes=50 * 1024 * 1024, max_age_seconds=30 * 24 * 3600):
+        self.path = path or os.path.join(DEFAULT_CACHE_DIR, "extraction.sqlite3")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS extractions (
+                    key TEXT PRIMARY KEY,
+                    csv_text TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )
+                """
+            )
+
+    def _connect(self):
+        # A fresh connection per operation keeps the cache safe to share across Streamlit script threads
+        return sqlite3.connect(self.path, timeout=10)
+
+    @staticmethod
+    def make_key(file_bytes, model, prompt):
+        """
+        Builds the cache key from the document contents and the extraction settings.
+        """
+        h = hashlib.sha256()
+        h.update(file_bytes)
+        h.update(b"\0")
+        h.update(model.encode("utf-8"))
+        h.update(b"\0")
+        h.update(prompt.encode("utf-8"))
+        return h.hexdigest()
+
+    def get(self, key):
+        """
+        Returns the cached CSV text for the key, or None on a miss or expired entry.
+        """
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT csv_text, created FROM extractions WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.max_age_seconds and now - row[1] > self.max_age_seconds):
+                if row is not None:
+                    conn.execute("DELETE FROM extractions WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            conn.execute("UPDATE extractions SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def set(self, key, csv_text):
+        """
+        Stores the CSV text for the key and evicts old entries if the cache is over budget.
+        """
+        now = time.time()
+        size = len(csv_text.encode("utf-8"))
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO extractions (key, csv_text, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, csv_text, size, now, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        if self.max_age_seconds:
+            conn.execute("DELETE FROM extractions WHERE created < ?", (now - self.max_age_seconds,))
+
+        # Keep the most recently used entries that fit inside both the count and byte budgets
+        rows = conn.execute("SELECT key, size FROM extractions ORDER BY accessed DESC").fetchall()
+        kept_bytes = 0
+        stale = []
+        for idx, (key, size) in enumerate(rows):
+            kept_bytes += size
+            if idx >= self.max_entries or kept_bytes > self.max_bytes:
+                stale.append((key,))
+        if stale:
+            conn.executemany("DELETE FROM extractions WHERE key = ?", stale)
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM extractions")
+
+    def stats(self):
+        """
+        Returns hit/miss counters for this process together with the on-disk footprint.
+        """
+        with self._connect() as conn:
+            entries, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extractions").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": total_bytes}
+
+
+_extraction_cache = None
+_extraction_cache_lock = threading.Lock()
+
+
+def get_extraction_cache():
+    """
+    Returns the process-wide extraction cache, creating it on first use.
+    """
+    global _extraction_cache
+    with _extraction_cache_lock:
+        if _extraction_cache is None:
+            _extraction_cache = ExtractionCache()
+        return _extraction_cache
+
+
+class DocumentCache:
+    """
+    Two-tier cache for generated documents (PDF/XLSX bytes): an in-memory LRU in
+    front of an optional SQLite store on disk, each bounded by total bytes.
+    Keys are content hashes (see core.artifacts.document_key), so entries never go
+    stale; they are simply evicted once they fall out of use.
+    Pass path=None to keep the cache in memory only.
+    """
+
+    def __init__(self, path=None, max_memory_bytes=64 * 1024 * 1024, max_disk_bytes=256 * 1024 * 1024,
+                 max_age_seconds=7 * 24 * 3600):
+        self.path = path
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.max_age_seconds = max_age_seconds
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS documents (
+                        key TEXT PRIMARY KEY,
+                        data BLOB NOT NULL,
+                        size INTEGER NOT NULL,
+                        created REAL NOT NULL,
+                        accessed REAL NOT NULL
+                    )
+                    """
+                )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _remember(self, key, data):
+        # Caller holds the lock
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        if len(data) > self.max_memory_bytes:
+            return
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def get(self, key):
+        """
+        Returns the cached document bytes for the key, or None on a miss.
+        """
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return data
+
+            if self.path:
+                now = time.time()
+                with self._connect() as conn:
+                    row = conn.execute("SELECT data, created FROM documents WHERE key = ?", (key,)).fetchone()
+                    if row is not None and self.max_age_seconds and now - row[1] > self.max_age_seconds:
+                        conn.execute("DELETE FROM documents WHERE key = ?", (key,))
+                        row = None
+                    if row is not None:
+                        conn.execute("UPDATE documents SET accessed = ? WHERE key = ?", (now, key))
+                if row is not None:
+                    data = bytes(row[0])
+                    self._remember(key, data)
+                    self.disk_hits += 1
+                    return data
+
+            self.misses += 1
+            return None
+
+    def set(self, key, data):
+        """
+        Stores document bytes under the key in memory and, if enabled, on disk.
+        """
+        data = bytes(data)
+        with self._lock:
+            self._remember(key, data)
+            if self.path and len(data) <= self.max_disk_bytes:
+                now = time.time()
+                with self._connect() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO documents (key, data, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                        (key, sqlite3.Binary(data), len(data), now, now),
+                    )
+                    self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        if self.max_age_seconds:
+            conn.execute("DELETE FROM documents WHERE created < ?", (now - self.max_age_seconds,))
+
+        # Keep the most recently used documents that fit inside the byte budget
+        rows = conn.execute("SELECT key, size FROM documents ORDER BY accessed DESC").fetchall()
+        kept_bytes = 0
+        stale = []
+        for key, size in rows:
+            kept_bytes += size
+            if kept_bytes > self.max_disk_bytes:
+                stale.append((key,))
+        if stale:
+            conn.executemany("DELETE FROM documents WHERE key = ?", stale)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self.path:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM documents")
+
+    def stats(self):
+        """
+        Returns hit counters per tier, the overall hit rate and the footprint of both tiers.
+        """
+        with self._lock:
+            stats = {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": 0,
+                "disk_bytes": 0,
+            }
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        if self.path:
+            with self._connect() as conn:
+                stats["disk_entries"], stats["disk_bytes"] = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM documents"
+                ).fetchone()
+        return stats
+
+
+_document_cache = None
+_document_cache_lock = threading.Lock()
+
+
+def get_document_cache():
+    """
+    Returns the process-wide document cache, creating it on first use.
+    Set QUOTER_DOCUMENT_CACHE=memory to keep generated documents off disk.
+    """
+    global _document_cache
+    with _document_cache_lock:
+        if _document_cache is None:
+            if os.environ.get("QUOTER_DOCUMENT_CACHE", "").lower() == "memory":
+                _document_cache = DocumentCache()
+            else:
+                _document_cache = DocumentCache(path=os.path.join(DEFAULT_CACHE_DIR, "documents.sqlite3"))
+        return _document_cache
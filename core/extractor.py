@@ -1,12 +1,15 @@
 import pdfplumber
 import pandas as pd
 import openpyxl
-import os
 import io
+import re
 from io import BytesIO
-from google import genai
 from google.genai import types
 
+from core.cache import get_extraction_cache
+from core.gemini import get_client
+from core.normalize import canonical_column
+
 def extract_excel_data(file_bytes):
     """
     Extracts data from an uploaded Excel file.
@@ -16,18 +19,9 @@ def extract_excel_data(file_bytes):
     wb = openpyxl.load_workbook(filename=BytesIO(file_bytes), data_only=False)
     return wb
 
-def extract_pdf_data(file_bytes):
-    """
-    Extracts tabular data from an uploaded PDF using Gemini.
-    Returns: A list of pandas DataFrames representing tables.
-    """
-    # Ensure API Key is set
-    if not os.environ.get("GEMINI_API_KEY"):
-        raise ValueError("GEMINI_API_KEY environment variable is missing. Please add it to your .env file.")
-        
-    client = genai.Client()
-    
-    prompt = """
+MODEL_NAME = 'gemini-2.5-flash'
+
+EXTRACTION_PROMPT = """
 You are a highly accurate data extraction tool.
 I am providing you with a PDF document that contains quotation/invoice data.
 Your objective is to extract ALL of the main tabular items/products data (e.g. description, quantity, unit price, total).
@@ -36,40 +30,584 @@ Output the extracted table strictly in valid CSV format.
 Do NOT wrap the output in markdown blocks (e.g. ```csv). Send back ONLY the raw CSV text.
 The first row must contain the column headers.
 """
+
+def _clean_csv_text(text):
+    """
+    Strips whitespace and any markdown fences the model wrapped around the CSV.
+    """
+    csv_text = text.strip()
+    
+    # If the model stubbornly returned markdown blocks, strip them
+    if csv_text.startswith("```csv"):
+        csv_text = csv_text[6:]
+    if csv_text.startswith("```"):
+        csv_text = csv_text[3:]
+    if csv_text.endswith("```"):
+        csv_text = csv_text[:-3]
+        
+    return csv_text.strip()
+
+def _parse_csv_text(csv_text):
+    """
+    Parses cleaned CSV text into the list-of-DataFrames shape returned by the extractors.
+    """
+    if not csv_text:
+        return []
+        
+    # Parse the CSV into a pandas DataFrame, skipping bad lines to prevent tokenizing errors
+    df = pd.read_csv(io.StringIO(csv_text), on_bad_lines='skip')
+    return [df]
+
+CHUNK_PROMPT = EXTRACTION_PROMPT + """
+NOTE: This PDF contains only pages {start} to {end} of a larger document.
+Rows may continue from a previous page; still output the column headers as the first row.
+"""
+
+# Documents longer than this are split and extracted page-range by page-range
+CHUNKED_PAGE_THRESHOLD = 10
+DEFAULT_PAGES_PER_CHUNK = 5
+DEFAULT_MAX_WORKERS = 4
+
+def count_pdf_pages(file_bytes):
+    """
+    Returns the number of pages in the PDF.
+    """
+    with pdfplumber.open(BytesIO(file_bytes)) as pdf:
+        return len(pdf.pages)
+
+def _page_runs(pages, pages_per_chunk):
+    """
+    Groups sorted 1-based page numbers into contiguous runs of at most pages_per_chunk pages.
+    """
+    runs = []
+    for page in sorted(pages):
+        if runs and page == runs[-1][-1] + 1 and len(runs[-1]) < pages_per_chunk:
+            runs[-1].append(page)
+        else:
+            runs.append([page])
+    return runs
+
+def _write_pages(pdfium, src, pages):
+    dst = pdfium.PdfDocument.new()
+    try:
+        dst.import_pages(src, [page - 1 for page in pages])
+        buf = BytesIO()
+        dst.save(buf)
+        return buf.getvalue()
+    finally:
+        dst.close()
+
+def split_pdf_pages(file_bytes, pages_per_chunk=DEFAULT_PAGES_PER_CHUNK, pages=None):
+    """
+    Splits a PDF into standalone PDFs of at most pages_per_chunk consecutive pages each.
+    If pages (1-based page numbers) is given, only those pages are included.
+    Returns: A list of (first_page, last_page, pdf_bytes) tuples with 1-based page numbers.
+    """
+    # pypdfium2 ships with pdfplumber and is the only one of the two that can write PDFs
+    import pypdfium2 as pdfium
+    
+    src = pdfium.PdfDocument(file_bytes)
     try:
-        # We upload the bare bytes to Gemini File API (requires generating a file-like object first if not local, 
-        # but the new API supports inline base64 or direct bytes passing via the models.generate_content API)
+        if pages is None:
+            pages = range(1, len(src) + 1)
+        return [(run[0], run[-1], _write_pages(pdfium, src, run)) for run in _page_runs(pages, pages_per_chunk)]
+    finally:
+        src.close()
+
+def subset_pdf_pages(file_bytes, pages):
+    """
+    Returns a single PDF containing only the given 1-based pages, in order.
+    """
+    import pypdfium2 as pdfium
+    
+    src = pdfium.PdfDocument(file_bytes)
+    try:
+        return _write_pages(pdfium, src, sorted(pages))
+    finally:
+        src.close()
+
+def _request_csv(client, prompt, pdf_bytes):
+    """
+    Sends a single PDF to Gemini and returns the cleaned CSV text of its reply.
+    """
+    # We upload the bare bytes to Gemini File API (requires generating a file-like object first if not local, 
+    # but the new API supports inline base64 or direct bytes passing via the models.generate_content API)
+    response = client.models.generate_content(
+        model=MODEL_NAME,
+        contents=[
+            prompt,
+            types.Part.from_bytes(
+                data=pdf_bytes,
+                mime_type='application/pdf',
+            )
+        ]
+    )
+    return _clean_csv_text(response.text or "")
+
+def _header_key(name):
+    return str(name).strip().lower()
+
+def _reconcile_columns(df, columns):
+    """
+    Maps a chunk's columns onto the canonical header taken from the first chunk.
+    """
+    keys = [_header_key(c) for c in columns]
+    chunk_keys = [_header_key(c) for c in df.columns]
+    if sorted(chunk_keys) != sorted(keys) and len(chunk_keys) == len(keys):
+        # Same width but the model reworded the header, so align by position
+        df = df.copy()
+        df.columns = columns
+        return df
         
-        response = client.models.generate_content(
-            model='gemini-2.5-flash',
-            contents=[
-                prompt,
-                types.Part.from_bytes(
-                    data=file_bytes,
-                    mime_type='application/pdf',
-                )
-            ]
-        )
+    # Otherwise match by normalized name, leaving unknown columns at the end
+    by_key = dict(zip(keys, columns))
+    rename_map = {c: by_key[_header_key(c)] for c in df.columns if _header_key(c) in by_key}
+    df = df.rename(columns=rename_map)
+    extra = [c for c in df.columns if c not in columns]
+    return df.reindex(columns=list(columns) + extra)
+
+def _row_keys(df):
+    return [tuple(str(v).strip() for v in row) for row in df.fillna("").astype(str).itertuples(index=False)]
+
+def _is_partial_row(key, required):
+    # required: positions of the recognised Description/Quantity/Unit Price/Total columns
+    return any(pos >= len(key) or key[pos] == "" for pos in required)
+
+def stitch_csv_fragments(fragments):
+    """
+    Combines per-chunk CSV fragments into one DataFrame.
+    Reconciles headers against the first fragment, drops header rows the model repeated
+    as data, and removes a partial row that straddles a page boundary when both
+    neighbouring chunks emitted it. Complete rows are always kept, since identical
+    consecutive line items are legitimate.
+    """
+    frames = []
+    for fragment in fragments:
+        for df in _parse_csv_text(fragment):
+            if not df.empty:
+                frames.append(df)
+    if not frames:
+        return None
         
-        csv_text = response.text.strip()
+    columns = list(frames[0].columns)
+    header_row = tuple(_header_key(c) for c in columns)
+    required = [pos for pos, c in enumerate(columns) if canonical_column(c) is not None]
+    
+    stitched = [frames[0]]
+    prev_keys = _row_keys(frames[0])
+    for df in frames[1:]:
+        df = _reconcile_columns(df, columns)
+        keys = _row_keys(df)
         
-        # If the model stubbornly returned markdown blocks, strip them
-        if csv_text.startswith("```csv"):
-            csv_text = csv_text[6:]
-        if csv_text.startswith("```"):
-            csv_text = csv_text[3:]
-        if csv_text.endswith("```"):
-            csv_text = csv_text[:-3]
-            
-        csv_text = csv_text.strip()
+        # Drop repeated header rows
+        keep = [tuple(k.lower() for k in key[:len(header_row)]) != header_row for key in keys]
+        df = df[keep]
+        keys = [k for k, flag in zip(keys, keep) if flag]
+        
+        # A row cut by a page break is often emitted, incomplete, by both neighbouring chunks
+        if keys and prev_keys and keys[0] == prev_keys[-1] and _is_partial_row(keys[0], required):
+            df = df.iloc[1:]
+            keys = keys[1:]
             
-        if not csv_text:
-            return []
+        stitched.append(df)
+        prev_keys = keys or prev_keys
+        
+    # Round-trip through CSV so dtypes are inferred as if the document came back in one piece
+    combined = pd.concat(stitched, ignore_index=True)
+    return pd.read_csv(io.StringIO(combined.to_csv(index=False)))
+
+# --- Local pdfplumber tier ---
+
+# Minimum score for a locally extracted table to be trusted without asking Gemini
+LOCAL_SCORE_THRESHOLD = 0.8
+
+# Checked in order, so "Unit Price" is claimed by price before "unit" could mean quantity
+COLUMN_ROLE_KEYWORDS = [
+    ("total", ("total", "amount", "ext")),
+    ("unit_price", ("price", "unit", "cost", "rate")),
+    ("quantity", ("qty", "quant")),
+    ("description", ("desc", "item", "product", "service")),
+]
+
+AMOUNT_PATTERN = re.compile(r"\d[\d,]*\.\d{2}\b")
+
+def _column_roles(columns):
+    """
+    Maps each quotation role (description/quantity/unit_price/total) to the first matching column.
+    """
+    roles = {}
+    for col in columns:
+        cl = str(col).lower()
+        for role, keywords in COLUMN_ROLE_KEYWORDS:
+            if role not in roles and any(k in cl for k in keywords):
+                roles[role] = col
+                break
+    return roles
+
+def score_table(df):
+    """
+    Scores how much a table looks like a quotation line-item table, from 0.0 to 1.0.
+    Half the score is column coverage (description/qty/price/total headers present),
+    half is the share of non-empty qty/price/total cells that parse as numbers.
+    """
+    roles = _column_roles(df.columns)
+    coverage = len(roles) / len(COLUMN_ROLE_KEYWORDS)
+    
+    numeric_cols = [roles[r] for r in ("quantity", "unit_price", "total") if r in roles]
+    if df.empty or not numeric_cols:
+        return 0.5 * coverage
+        
+    cells = df[numeric_cols].astype(str).stack().str.strip()
+    cells = cells[~cells.str.lower().isin(("", "nan", "none"))]
+    if cells.empty:
+        return 0.5 * coverage
+    parsed = pd.to_numeric(cells.str.replace(r'[^\d\.\-]', '', regex=True), errors='coerce')
+    return 0.5 * coverage + 0.5 * parsed.notna().mean()
+
+def _table_to_frame(rows, columns=None):
+    """
+    Turns a pdfplumber table (list of rows) into a DataFrame, using the first row as header
+    unless the columns of a table continued from the previous page are given.
+    """
+    rows = [[(cell or "").replace("\n", " ").strip() for cell in row] for row in rows]
+    rows = [row for row in rows if any(row)]
+    if columns is None:
+        if len(rows) < 2:
+            return None
+        columns, rows = rows[0], rows[1:]
+    return pd.DataFrame(rows, columns=columns)
+
+def extract_pdf_tables_local(file_bytes, threshold=LOCAL_SCORE_THRESHOLD):
+    """
+    Extracts line-item tables locally with pdfplumber, page by page.
+    Returns: (page_count, pages) where pages maps each 1-based page number to a list of
+    accepted DataFrames, or to None when the page needs the Gemini fallback.
+    Pages without tables or money amounts (cover letters, terms) map to an empty list.
+    """
+    pages = {}
+    with pdfplumber.open(BytesIO(file_bytes)) as pdf:
+        page_count = len(pdf.pages)
+        prev_columns = None
+        for page_no, page in enumerate(pdf.pages, 1):
+            accepted = []
+            for rows in page.extract_tables():
+                df = _table_to_frame(rows)
+                if df is None:
+                    continue
+                if score_table(df) < threshold and prev_columns is not None and len(rows[0]) == len(prev_columns):
+                    # A table running over a page break usually has no header on the next page
+                    df = _table_to_frame(rows, prev_columns)
+                if score_table(df) >= threshold:
+                    accepted.append(df)
+                    prev_columns = list(df.columns)
+                    
+            if accepted:
+                pages[page_no] = accepted
+                continue
+                
+            # Scanned pages have no text layer, so only Gemini can read them
+            text = page.extract_text() or ""
+            pages[page_no] = None if not text.strip() or AMOUNT_PATTERN.search(text) else []
             
-        # Parse the CSV into a pandas DataFrame, skipping bad lines to prevent tokenizing errors
-        df = pd.read_csv(io.StringIO(csv_text), on_bad_lines='skip')
-        return [df]
+    if not any(pages.values()):
+        # Nothing usable locally, so let Gemini see every page rather than guessing which matter
+        pages = {page_no: None for page_no in pages}
+    return page_count, pages
+
+# --- Gemini tier ---
+
+def _extract_pages_with_gemini(file_bytes, pages, page_count, client,
+                               pages_per_chunk=DEFAULT_PAGES_PER_CHUNK, max_workers=DEFAULT_MAX_WORKERS, chunked=None):
+    """
+    Sends the given 1-based pages to Gemini, in concurrent page-range chunks when chunked.
+    Returns: A list of (first_page, csv_text) fragments.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    
+    if chunked is None:
+        chunked = len(pages) > CHUNKED_PAGE_THRESHOLD
+    whole_document = len(pages) == page_count
+    
+    if whole_document and not chunked:
+        return [(1, _request_csv(client, EXTRACTION_PROMPT, file_bytes))]
         
+    chunks = split_pdf_pages(file_bytes, pages_per_chunk if chunked else max(page_count, 1), pages=pages)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as pool:
+        fragments = list(pool.map(
+            lambda chunk: _request_csv(client, CHUNK_PROMPT.format(start=chunk[0], end=chunk[1]), chunk[2]),
+            chunks
+        ))
+    return [(chunk[0], fragment) for chunk, fragment in zip(chunks, fragments)]
+
+def _extraction_cache_key(cache, file_bytes, pipeline):
+    return cache.make_key(file_bytes, MODEL_NAME, f"{EXTRACTION_PROMPT}\0{CHUNK_PROMPT}\0{pipeline}")
+
+def _cached_extraction(file_bytes, pipeline, force_refresh, cache, extract):
+    """
+    Runs extract() through the extraction cache. extract returns a DataFrame or None.
+    """
+    if cache is None:
+        cache = get_extraction_cache()
+    cache_key = _extraction_cache_key(cache, file_bytes, pipeline)
+    
+    if not force_refresh:
+        cached_csv = cache.get(cache_key)
+        if cached_csv is not None:
+            return _parse_csv_text(cached_csv)
+            
+    try:
+        df = extract()
     except Exception as e:
         print(f"Gemini extraction failed: {e}")
         raise ValueError(f"Gemini extraction failed: {e}")
+        
+    if df is None or df.empty:
+        return []
+    cache.set(cache_key, df.to_csv(index=False))
+    return [df]
+
+def extract_pdf_data_chunked(file_bytes, pages_per_chunk=DEFAULT_PAGES_PER_CHUNK, max_workers=DEFAULT_MAX_WORKERS,
+                             client=None, force_refresh=False, cache=None):
+    """
+    Extracts tabular data from a large PDF by sending page ranges to Gemini concurrently
+    and stitching the resulting CSV fragments back together.
+    Returns: A list of pandas DataFrames representing tables.
+    """
+    def extract():
+        gemini = client or get_client()
+        page_count = count_pdf_pages(file_bytes)
+        fragments = _extract_pages_with_gemini(
+            file_bytes, range(1, page_count + 1), page_count, gemini,
+            pages_per_chunk=pages_per_chunk, max_workers=max_workers, chunked=True
+        )
+        return stitch_csv_fragments([csv_text for _, csv_text in fragments])
+        
+    return _cached_extraction(file_bytes, f"chunked:{pages_per_chunk}", force_refresh, cache, extract)
+
+def _local_tier(file_bytes, local_first):
+    """
+    Runs the pdfplumber tier.
+    Returns: (page_count, fragments, fallback_pages) where fragments are (page, csv_text) pairs
+    read locally and fallback_pages still need Gemini. page_count is 0 if the PDF is unreadable.
+    """
+    try:
+        if not local_first:
+            raise ValueError("local extraction disabled")
+        page_count, pages = extract_pdf_tables_local(file_bytes)
+    except Exception:
+        # Unreadable locally (or disabled): the whole document goes to Gemini
+        try:
+            page_count = count_pdf_pages(file_bytes)
+        except Exception:
+            page_count = 0
+        pages = {page_no: None for page_no in range(1, page_count + 1)}
+        
+    fragments = []
+    for page_no, frames in pages.items():
+        for df in frames or []:
+            fragments.append((page_no, df.to_csv(index=False)))
+    fallback_pages = [page_no for page_no, frames in pages.items() if frames is None]
+    return page_count, fragments, fallback_pages
+
+def _tiered_pipeline(local_first):
+    return f"tiered:{LOCAL_SCORE_THRESHOLD}" if local_first else "gemini"
+
+def extract_pdf_data(file_bytes, force_refresh=False, cache=None, client=None, chunked=None, local_first=True):
+    """
+    Extracts tabular data from an uploaded PDF.
+    Clean machine-generated tables are read locally with pdfplumber; only pages whose tables
+    score below LOCAL_SCORE_THRESHOLD are sent to Gemini, in parallel page chunks when there
+    are more than CHUNKED_PAGE_THRESHOLD of them (or when chunked=True).
+    Results are cached by PDF contents; pass force_refresh=True to skip the cache lookup
+    (e.g. for "Retry Extraction") while still storing the fresh result.
+    Returns: A list of pandas DataFrames representing tables.
+    """
+    def extract():
+        page_count, fragments, fallback_pages = _local_tier(file_bytes, local_first)
+        if fallback_pages or not page_count:
+            gemini = client or get_client()
+            if page_count:
+                fragments += _extract_pages_with_gemini(file_bytes, fallback_pages, page_count, gemini, chunked=chunked)
+            else:
+                fragments.append((1, _request_csv(gemini, EXTRACTION_PROMPT, file_bytes)))
+                
+        fragments.sort(key=lambda fragment: fragment[0])
+        return stitch_csv_fragments([csv_text for _, csv_text in fragments])
+        
+    return _cached_extraction(file_bytes, _tiered_pipeline(local_first), force_refresh, cache, extract)
+
+# --- Streaming ---
+
+DEFAULT_STREAM_BATCH_ROWS = 25
+
+class CsvStreamParser:
+    """
+    Incrementally splits streamed CSV text into complete records.
+    A newline only ends a record when it is outside a quoted field, so quoted
+    multi-line descriptions are never cut in half. Markdown fences are dropped.
+    """
+
+    def __init__(self):
+        self.header = None
+        self._buffer = ""
+        self._scan_pos = 0
+        self._in_quotes = False
+
+    def feed(self, text):
+        """
+        Adds streamed text and returns the list of data lines completed by it.
+        The first complete line is kept as the header and not returned.
+        """
+        self._buffer += text
+        lines = []
+        while True:
+            end = self._next_record_end()
+            if end < 0:
+                break
+            line = self._buffer[:end].rstrip("\r")
+            self._buffer = self._buffer[end + 1:]
+            self._scan_pos = 0
+            self._accept(line, lines)
+        return lines
+
+    def close(self):
+        """
+        Flushes the final record, which the model may not terminate with a newline.
+        """
+        lines = []
+        tail = _clean_csv_text(self._buffer)
+        self._buffer = ""
+        if tail:
+            for line in tail.split("\n"):
+                self._accept(line.rstrip("\r"), lines)
+        return lines
+
+    def _next_record_end(self):
+        for i in range(self._scan_pos, len(self._buffer)):
+            ch = self._buffer[i]
+            if ch == '"':
+                self._in_quotes = not self._in_quotes
+            elif ch == "\n" and not self._in_quotes:
+                return i
+        self._scan_pos = len(self._buffer)
+        return -1
+
+    def _accept(self, line, lines):
+        stripped = line.strip()
+        if not stripped or stripped.startswith("```"):
+            return
+        if self.header is None:
+            self.header = line
+        elif stripped != self.header.strip():
+            lines.append(line)
+
+    def to_frame(self, lines):
+        """
+        Parses data lines under the header exactly as the non-streaming path would.
+        """
+        return pd.read_csv(io.StringIO("\n".join([self.header] + lines)), on_bad_lines='skip')
+
+def _stream_csv_batches(client, prompt, pdf_bytes, batch_rows, collected):
+    """
+    Streams a Gemini reply and yields DataFrames of newly completed rows.
+    The first row is yielded on its own so the caller can show data as early as possible.
+    All accepted lines are appended to collected as CSV text for caching.
+    """
+    parser = CsvStreamParser()
+    pending = []
+    first = True
+    
+    stream = client.models.generate_content_stream(
+        model=MODEL_NAME,
+        contents=[
+            prompt,
+            types.Part.from_bytes(
+                data=pdf_bytes,
+                mime_type='application/pdf',
+            )
+        ]
+    )
+    for chunk in stream:
+        pending += parser.feed(chunk.text or "")
+        if pending and (first or len(pending) >= batch_rows):
+            collected.extend(pending)
+            yield parser.to_frame(pending)
+            pending = []
+            first = False
+            
+    pending += parser.close()
+    if pending:
+        collected.extend(pending)
+        yield parser.to_frame(pending)
+    if parser.header is not None:
+        collected.insert(0, parser.header)
+
+def _stream_prompts(file_bytes, fallback_pages, page_count, pages_per_chunk, chunked):
+    """
+    Plans the streamed Gemini requests for the pages that need it, mirroring
+    _extract_pages_with_gemini: one request for a short run of pages, or one per
+    page-range chunk when there are more than CHUNKED_PAGE_THRESHOLD of them, so long
+    documents are not truncated.
+    Returns: A list of (first_page, prompt, pdf_bytes).
+    """
+    if not page_count:
+        return [(1, EXTRACTION_PROMPT, file_bytes)]
+    if chunked is None:
+        chunked = len(fallback_pages) > CHUNKED_PAGE_THRESHOLD
+    if chunked:
+        return [(first, CHUNK_PROMPT.format(start=first, end=last), chunk)
+                for first, last, chunk in split_pdf_pages(file_bytes, pages_per_chunk, pages=fallback_pages)]
+    if len(fallback_pages) < page_count:
+        return [(min(fallback_pages), EXTRACTION_PROMPT, subset_pdf_pages(file_bytes, fallback_pages))]
+    return [(1, EXTRACTION_PROMPT, file_bytes)]
+
+def stream_pdf_data(file_bytes, batch_rows=DEFAULT_STREAM_BATCH_ROWS, force_refresh=False, cache=None, client=None,
+                    local_first=True, pages_per_chunk=DEFAULT_PAGES_PER_CHUNK, chunked=None):
+    """
+    Streaming variant of extract_pdf_data.
+    Yields DataFrames of rows as they become available: locally extracted tables first,
+    then batches parsed from Gemini's streamed replies for the pages that need it
+    (page-range by page-range for long documents). The batches are a preview; the
+    generator's return value is the final table, stitched exactly as extract_pdf_data
+    stitches it (or None if nothing was found), and that is also what gets cached.
+    """
+    if cache is None:
+        cache = get_extraction_cache()
+    cache_key = _extraction_cache_key(cache, file_bytes, _tiered_pipeline(local_first))
+    
+    if not force_refresh:
+        cached_csv = cache.get(cache_key)
+        if cached_csv is not None:
+            frames = _parse_csv_text(cached_csv)
+            yield from frames
+            return frames[0] if frames else None
+            
+    page_count, fragments, fallback_pages = _local_tier(file_bytes, local_first)
+    
+    columns = None
+    for _, csv_text in fragments:
+        for df in _parse_csv_text(csv_text):
+            if columns is None:
+                columns = list(df.columns)
+            yield _reconcile_columns(df, columns)
+            
+    if fallback_pages or not page_count:
+        try:
+            gemini = client or get_client()
+            for first_page, prompt, pdf_bytes in _stream_prompts(file_bytes, fallback_pages, page_count, pages_per_chunk, chunked):
+                collected = []
+                for df in _stream_csv_batches(gemini, prompt, pdf_bytes, batch_rows, collected):
+                    if columns is None:
+                        columns = list(df.columns)
+                    yield _reconcile_columns(df, columns)
+                fragments.append((first_page, "\n".join(collected)))
+        except Exception as e:
+            print(f"Gemini extraction failed: {e}")
+            raise ValueError(f"Gemini extraction failed: {e}")
+        
+    fragments.sort(key=lambda fragment: fragment[0])
+    df = stitch_csv_fragments([csv_text for _, csv_text in fragments])
+    if df is None or df.empty:
+        return None
+    cache.set(cache_key, df.to_csv(index=False))
+    return df
@@ -0,0 +1,133 @@
+import os
+import random
+import threading
+import time
+
+import httpx
+from google import genai
+from google.genai import errors, types
+
+DEFAULT_TIMEOUT_SECONDS = float(os.environ.get("GEMINI_TIMEOUT_SECONDS", "120"))
+DEFAULT_MAX_RETRIES = int(os.environ.get("GEMINI_MAX_RETRIES", "4"))
+DEFAULT_BACKOFF_SECONDS = 1.0
+DEFAULT_MAX_BACKOFF_SECONDS = 30.0
+
+# Rate limiting, timeouts and transient server errors are worth another attempt
+RETRYABLE_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+
+
+def is_retryable(exc):
+    if isinstance(exc, errors.APIError):
+        return exc.code in RETRYABLE_STATUS_CODES
+    return isinstance(exc, httpx.TransportError)
+
+
+class _RetryingModels:
+    """
+    Mirrors the subset of client.models used by the extractor, adding retries.
+    """
+
+    def __init__(self, owner):
+        self._owner = owner
+
+    def generate_content(self, **kwargs):
+        return self._owner.call_with_retry(lambda: self._owner.raw.models.generate_content(**kwargs))
+
+    def generate_content_stream(self, **kwargs):
+        # Only the request itself is retried: once chunks have been handed out,
+        # replaying the stream would duplicate rows for the caller.
+        def open_stream():
+            stream = iter(self._owner.raw.models.generate_content_stream(**kwargs))
+            return stream, next(stream, None)
+
+        stream, first = self._owner.call_with_retry(open_stream)
+        if first is not None:
+            yield first
+            yield from stream
+
+
+class GeminiClient:
+    """
+    Long-lived Gemini client shared by all extraction paths.
+    One underlying httpx connection pool is reused across calls (keep-alive), every
+    request gets a timeout, and 429/5xx/transport failures are retried with
+    exponential backoff plus jitter. Pass transport (e.g. httpx.MockTransport) or
+    base_url to point the client at a local fake server in tests.
+    """
+
+    def __init__(self, api_key=None, timeout=DEFAULT_TIMEOUT_SECONDS, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff=DEFAULT_BACKOFF_SECONDS, max_backoff=DEFAULT_MAX_BACKOFF_SECONDS,
+                 transport=None, base_url=None, max_connections=20, sleep=time.sleep):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retries = 0
+        self._sleep = sleep
+
+        client_args = {
+            "limits": httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections, keepalive_expiry=120),
+        }
+        if transport is not None:
+            client_args["transport"] = transport
+        http_options = types.HttpOptions(
+            timeout=int(timeout * 1000),
+            base_url=base_url or os.environ.get("GEMINI_BASE_URL") or None,
+            client_args=client_args,
+        )
+        self.raw = genai.Client(api_key=api_key, http_options=http_options)
+        self.models = _RetryingModels(self)
+
+    def backoff_delay(self, attempt):
+        """
+        Full-jitter exponential backoff: a random delay up to backoff * 2**attempt, capped.
+        """
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def call_with_retry(self, fn):
+        attempt = 0
+        while True:
+            try:
+                return fn()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = self.backoff_delay(attempt)
+                print(f"Gemini request failed ({e}); retrying in {delay:.1f}s")
+                self.retries += 1
+                attempt += 1
+                self._sleep(delay)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Returns the process-wide Gemini client, creating it on first use.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            # Ensure API Key is set
+            if not os.environ.get("GEMINI_API_KEY"):
+                raise ValueError("GEMINI_API_KEY environment variable is missing. Please add it to your .env file.")
+            _client = GeminiClient()
+        return _client
+
+
+def configure_client(**kwargs):
+    """
+    Replaces the process-wide client, e.g. with a fake transport in tests.
+    Returns the new client.
+    """
+    global _client
+    with _client_lock:
+        _client = GeminiClient(**kwargs)
+        return _client
+
+
+def reset_client():
+    global _client
+    with _client_lock:
+        _client = None
@@ -1,341 +1,319 @@
-from weasyprint import HTML
-from jinja2 import Environment, FileSystemLoader
+from weasyprint import HTML, CSS
+from weasyprint.text.fonts import FontConfiguration
+from weasyprint.urls import URLFetcher, URLFetcherResponse
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, select_autoescape
 import os
+import threading
+from contextlib import contextmanager
+from copy import copy
 from datetime import datetime, timedelta
 
+from core.assets import ASSET_SCHEME, load_asset
+from core.cache import DEFAULT_CACHE_DIR
+from core.images import JPEG_QUALITY, LOGO_RENDER_HEIGHT, PDF_IMAGE_DPI, optimized_data_uri
+from core.quote import QuoteTable, currency_options, format_cents, format_money, to_cents
+
 # Note: pdfkit requires wkhtmltopdf to be installed on the system.
 
-def generate_final_pdf(marked_up_tables, config):
+TEMPLATES_DIR = os.environ.get(
+    "QUOTER_TEMPLATES_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates")
+)
+DEFAULT_TEMPLATE = "quotation.html"
+DEFAULT_STYLESHEET = "quotation.css"
+TEMPLATE_CACHE_DIR = os.path.join(DEFAULT_CACHE_DIR, "jinja")
+
+_template_env = None
+
+def get_template_env():
     """
-    Generates a PDF quotation using HTML templates and the marked-up data.
+    Returns the shared Jinja2 environment. Compiled templates are kept in memory and
+    their bytecode on disk, so each quotation costs a single render pass.
     """
-    
-    # Process newlines in addresses for HTML
-    sender_address_html = config.get('sender_address', '').replace('\n', '<br>')
-    recipient_address_html = config.get('recipient_address', '').replace('\n', '<br>')
-
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="utf-8">
-        <style>
-            @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
-            
-            body {{
-                font-family: 'Inter', sans-serif;
-                color: #334155;
-                background-color: #ffffff;
-                margin: 0;
-                padding: 40px 50px;
-                line-height: 1.6;
-            }}
-            .invoice-header {{
-                width: 100%;
-                margin-bottom: 40px;
-                border-bottom: 2px solid #3b82f6;
-                padding-bottom: 20px;
-            }}
-            .invoice-header td {{
-                vertical-align: top;
-            }}
-            .company-name {{
-                font-size: 32px;
-                font-weight: 800;
-                color: #1e293b;
-                margin: 0 0 5px 0;
-                letter-spacing: -0.5px;
-            }}
-            .company-details {{
-                font-size: 13px;
-                color: #64748b;
-            }}
-            .document-title {{
-                font-size: 36px;
-                font-weight: 800;
-                color: #3b82f6;
-                margin: 0;
-                text-align: right;
-                text-transform: uppercase;
-                letter-spacing: 2px;
-            }}
-            .document-meta {{
-                text-align: right;
-                font-size: 14px;
-                color: #64748b;
-                margin-top: 8px;
-            }}
-            
-            .addresses-table {{
-                width: 100%;
-                margin-bottom: 40px;
-            }}
-            .addresses-table td {{
-                vertical-align: top;
-                width: 50%;
-            }}
-            .address-block {{
-                padding-right: 40px;
-            }}
-            .address-label {{
-                font-size: 12px;
-                font-weight: 700;
-                color: #94a3b8;
-                text-transform: uppercase;
-                letter-spacing: 1px;
-                margin-bottom: 8px;
-                border-bottom: 1px solid #e2e8f0;
-                padding-bottom: 4px;
-            }}
-            .address-name {{
-                font-size: 16px;
-                font-weight: 700;
-                color: #1e293b;
-                margin: 0 0 4px 0;
-            }}
-            .address-text {{
-                font-size: 14px;
-                color: #475569;
-                margin: 0;
-                line-height: 1.5;
-            }}
-            
-            .job-details {{
-                background-color: #f8fafc;
-                border-left: 4px solid #3b82f6;
-                padding: 16px 24px;
-                margin-bottom: 40px;
-                border-radius: 0 8px 8px 0;
-            }}
-            .job-details h3 {{
-                margin: 0 0 8px 0;
-                font-size: 12px;
-                font-weight: 700;
-                color: #3b82f6;
-                text-transform: uppercase;
-                letter-spacing: 1px;
-            }}
-            .job-details p {{
-                margin: 0;
-                font-size: 14px;
-                color: #334155;
-            }}
-            
-            .items-table-container {{
-                margin-bottom: 20px;
-            }}
-            
-            .dataframe {{
-                width: 100%;
-                border-collapse: collapse;
-                margin-bottom: 10px;
-                font-size: 13px;
-            }}
-            .dataframe th {{
-                background-color: #f1f5f9;
-                color: #475569;
-                font-weight: 700;
-                text-align: left;
-                padding: 12px 16px;
-                border-bottom: 2px solid #cbd5e1;
-                text-transform: uppercase;
-                font-size: 11px;
-                letter-spacing: 0.5px;
-            }}
-            .dataframe td {{
-                padding: 12px 16px;
-                color: #334155;
-                border-bottom: 1px solid #e2e8f0;
-            }}
-            .dataframe tr:nth-child(even) td {{
-                background-color: #fafafa;
-            }}
-            
-            /* Align right for money/number columns */
-            .dataframe td:not(:first-child), .dataframe th:not(:first-child) {{
-                text-align: right;
-            }}
-            
-            .summary-table {{
-                width: 40%;
-                margin-left: auto;
-                border-collapse: collapse;
-                margin-bottom: 40px;
-            }}
-            .summary-table td {{
-                padding: 10px 16px;
-                font-size: 14px;
-                color: #334155;
-            }}
-            .summary-label {{
-                font-weight: 600;
-                text-align: right;
-                color: #64748b;
-            }}
-            .summary-value {{
-                text-align: right;
-                font-family: monospace;
-                font-size: 15px;
-            }}
-            .summary-total td {{
-                border-top: 2px solid #1e293b;
-                color: #0f172a;
-                font-weight: 800;
-                font-size: 16px;
-                background-color: #f8fafc;
-            }}
-            .summary-total .summary-label {{
-                color: #0f172a;
-            }}
-            
-            .signature-block {{
-                margin-top: 50px;
-                width: 300px;
-            }}
-            .signature-line {{
-                border-bottom: 1px solid #94a3b8;
-                margin-bottom: 8px;
-                height: 40px;
-            }}
-            .signature-name {{
-                font-size: 14px;
-                font-weight: 700;
-                color: #1e293b;
-            }}
-            .signature-label {{
-                font-size: 12px;
-                color: #64748b;
-                text-transform: uppercase;
-                letter-spacing: 0.5px;
-            }}
-
-            .footer {{
-                margin-top: 60px;
-                text-align: center;
-                color: #94a3b8;
-                font-size: 12px;
-                padding-top: 24px;
-                border-top: 1px solid #e2e8f0;
-            }}
-        </style>
-    </head>
-    <body>
-        <table class="invoice-header">
-            <tr>
-                <td>
-                    {f'<img src="data:{config.get("logo_mime", "image/png")};base64,{config.get("logo_base64")}" style="max-height: 80px; margin-bottom: 15px;">' if config.get("logo_base64") else ''}
-                    <h1 class="company-name">{config.get('sender_name', 'Your Company')}</h1>
-                    <div class="company-details">
-                        {config.get('sender_phone', '')}{' | ' if config.get('sender_phone') and config.get('sender_email') else ''}{config.get('sender_email', '')}<br>
-                        {sender_address_html}
-                    </div>
-                </td>
-                <td style="text-align: right;">
-                    <h1 class="document-title">Quotation</h1>
-                    <div class="document-meta">
-                        <strong>Date:</strong> {datetime.now().strftime("%B %d, %Y")}<br>
-                        <strong>Valid Until:</strong> {(datetime.now() + timedelta(days=14)).strftime("%B %d, %Y")}
-                    </div>
-                </td>
-            </tr>
-        </table>
-        
-        <table class="addresses-table">
-            <tr>
-                <td class="address-block">
-                    <div class="address-label">Quotation For</div>
-                    <div class="address-name">{config.get('recipient_name', 'Client Name')}</div>
-                    <p class="address-text">
-                        {config.get('recipient_contact', '')}<br>
-                        {recipient_address_html}
-                    </p>
-                </td>
-                <td class="address-block">
-                    <!-- Space for dual-column alignment -->
-                </td>
-            </tr>
-        </table>
-        
-        {f'''
-        <div class="job-details">
-            <h3>Job Description / Notes</h3>
-            <p>{config.get('job_description', '')}</p>
-        </div>
-        ''' if config.get('job_description') else ''}
-        
-        <div class="items-table-container">
+    global _template_env
+    if _template_env is None:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+        _template_env = Environment(
+            loader=FileSystemLoader(TEMPLATES_DIR),
+            autoescape=select_autoescape(["html"]),
+            bytecode_cache=FileSystemBytecodeCache(TEMPLATE_CACHE_DIR),
+            trim_blocks=True,
+            lstrip_blocks=True,
+        )
+    return _template_env
+
+def _money(value, **currency):
+    return format_cents(to_cents([value])[0], **currency)
+
+def build_quote_model(marked_up_tables, config):
+    """
+    Builds the structured model the quotation template renders: header details,
+    one {columns, rows} entry per table with cells as display strings, and summary lines.
+    marked_up_tables may be QuoteTable objects from prepare_quote or plain DataFrames.
     """
+    now = datetime.now()
+    currency = currency_options(config)
     
+    tables = []
     for df in marked_up_tables:
-        html_content += df.to_html(index=False, classes='dataframe')
+        # Money is kept in cents until this point; this is where it becomes text
+        if isinstance(df, QuoteTable):
+            df = df.display_frame(**currency)
+        tables.append({
+            "columns": [str(c) for c in df.columns],
+            "rows": df.astype(str).values.tolist(),
+        })
         
-    tax_label = f"Sales Tax ({config.get('sales_tax_percentage')}%)" if config.get('tax_type') == 'percentage' else "Sales Tax"
+    summary = [{"label": "Subtotal", "value": _money(config.get('calc_subtotal', 0.0), **currency)}]
+    if config.get("calc_discount", 0) > 0:
+        summary.append({"label": "Discount", "value": f"-{_money(config.get('calc_discount', 0.0), **currency)}"})
+    if config.get("calc_tax", 0) > 0:
+        tax_label = f"Sales Tax ({config.get('sales_tax_percentage')}%)" if config.get('tax_type') == 'percentage' else "Sales Tax"
+        summary.append({"label": tax_label, "value": _money(config.get('calc_tax', 0.0), **currency)})
+    if config.get("calc_markup", 0) > 0:
+        summary.append({"label": f"Markup ({config.get('markup_percentage', 0)}%)", "value": _money(config.get('calc_markup', 0.0), **currency)})
+    summary.append({"label": "GRAND TOTAL", "value": _money(config.get('calc_grand_total', 0.0), **currency), "total": True})
     
-    html_content += f"""
-        </div>
-        
-        <table class="summary-table">
-            <tr>
-                <td class="summary-label">Subtotal</td>
-                <td class="summary-value">${config.get('calc_subtotal', 0.0):,.2f}</td>
-            </tr>
-            {f'''
-            <tr>
-                <td class="summary-label">Discount</td>
-                <td class="summary-value">-${config.get('calc_discount', 0.0):,.2f}</td>
-            </tr>
-            ''' if config.get("calc_discount", 0) > 0 else ''}
-            {f'''
-            <tr>
-                <td class="summary-label">{tax_label}</td>
-                <td class="summary-value">${config.get('calc_tax', 0.0):,.2f}</td>
-            </tr>
-            ''' if config.get("calc_tax", 0) > 0 else ''}
-            {f'''
-            <tr>
-                <td class="summary-label">Markup ({config.get("markup_percentage", 0)}%)</td>
-                <td class="summary-value">${config.get('calc_markup', 0.0):,.2f}</td>
-            </tr>
-            ''' if config.get("calc_markup", 0) > 0 else ''}
-            <tr class="summary-total">
-                <td class="summary-label">GRAND TOTAL</td>
-                <td class="summary-value">${config.get('calc_grand_total', 0.0):,.2f}</td>
-            </tr>
-        </table>
+    logo_src = None
+    if config.get("logo_base64"):
+        # Resampled to what an 80px tall logo needs, however large the upload was
+        logo_src = optimized_data_uri(config["logo_base64"], config.get("logo_mime", "image/png"), LOGO_RENDER_HEIGHT)
         
-        <div class="signature-block">
-            <div class="signature-line"></div>
-            <div class="signature-name">{config.get("signature_name", "")}</div>
-            <div class="signature-label">Authorized Signature</div>
-        </div>
+    return {
+        "logo_src": logo_src,
+        "sender": {
+            "name": config.get('sender_name', 'Your Company'),
+            "phone": config.get('sender_phone', ''),
+            "email": config.get('sender_email', ''),
+            "address_lines": (config.get('sender_address') or '').split('\n'),
+        },
+        "recipient": {
+            "name": config.get('recipient_name', 'Client Name'),
+            "contact": config.get('recipient_contact', ''),
+            "address_lines": (config.get('recipient_address') or '').split('\n'),
+        },
+        "date": now.strftime("%B %d, %Y"),
+        "valid_until": (now + timedelta(days=14)).strftime("%B %d, %Y"),
+        "job_description": config.get('job_description', ''),
+        "tables": tables,
+        "summary": summary,
+        "signature_name": config.get("signature_name", ""),
+    }
+
+def render_quote_html(quote_model, template_name=DEFAULT_TEMPLATE, external_stylesheet=False):
+    """
+    Renders the quotation HTML from a model built by build_quote_model.
+    With external_stylesheet=True the <style> block is left out because the caller
+    supplies the pre-parsed stylesheet to WeasyPrint itself.
+    """
+    template = get_template_env().get_template(template_name)
+    return template.render(quote=quote_model, external_stylesheet=external_stylesheet)
+
+class LocalAssetFetcher(URLFetcher):
+    """
+    WeasyPrint URL fetcher that serves bundled assets (fonts) from an in-memory cache
+    and refuses any other network access, so rendering is deterministic and works offline.
+    """
+
+    def fetch(self, url, headers=None):
+        if url.startswith(ASSET_SCHEME):
+            data, mime_type = load_asset(url[len(ASSET_SCHEME):])
+            return URLFetcherResponse(url, body=data, headers={"Content-Type": mime_type})
+        if url.startswith("data:"):
+            # Inline images such as the company logo
+            return super().fetch(url, headers)
+        raise ValueError(f"Network access is disabled while rendering PDFs: {url}")
+
+# WeasyPrint image options: re-encode embedded images and cap their resolution
+PDF_RENDER_OPTIONS = {"optimize_images": True, "jpeg_quality": JPEG_QUALITY, "dpi": PDF_IMAGE_DPI}
+
+class QuoteRenderer:
+    """
+    Long-lived PDF renderer. The quotation stylesheet is parsed once, and the bundled
+    fonts it declares are loaded once into a FontConfiguration shared by every render,
+    so repeated generations only pay for the template pass and the layout.
+    """
+
+    def __init__(self, template_name=DEFAULT_TEMPLATE, stylesheet_name=DEFAULT_STYLESHEET):
+        env = get_template_env()
+        self.template_name = template_name
+        self.url_fetcher = LocalAssetFetcher()
+        self.font_config = FontConfiguration()
+        css_text = env.loader.get_source(env, stylesheet_name)[0]
+        self.stylesheet = CSS(string=css_text, font_config=self.font_config, url_fetcher=self.url_fetcher)
         
-        <div class="footer">
-            <p>Thank you for your business. Please contact us with any questions regarding this quotation.</p>
-        </div>
-    </body>
-    </html>
+    def render(self, quote_model, **pdf_options):
+        """
+        Renders a model built by build_quote_model to PDF bytes.
+        pdf_options override PDF_RENDER_OPTIONS for this render.
+        """
+        html_content = render_quote_html(quote_model, self.template_name, external_stylesheet=True)
+        return HTML(string=html_content, url_fetcher=self.url_fetcher).write_pdf(
+            stylesheets=[self.stylesheet],
+            font_config=self.font_config,
+            **dict(PDF_RENDER_OPTIONS, **pdf_options),
+        )
+
+# WeasyPrint objects are not documented as thread-safe, so a renderer is only ever used
+# by one thread at a time. Idle renderers are pooled per template for the whole process:
+# Streamlit runs every script execution on a fresh thread, so per-thread caching would
+# rebuild the stylesheet and fonts for nearly every PDF.
+MAX_IDLE_RENDERERS = 8
+_idle_renderers = {}
+_idle_renderers_lock = threading.Lock()
+
+def _new_renderer(template_name):
+    # A template "name.html" is paired with "name.css" when that stylesheet exists
+    stylesheet_name = os.path.splitext(template_name)[0] + ".css"
+    if not os.path.exists(os.path.join(TEMPLATES_DIR, stylesheet_name)):
+        stylesheet_name = DEFAULT_STYLESHEET
+    return QuoteRenderer(template_name, stylesheet_name)
+
+@contextmanager
+def checkout_renderer(template_name=DEFAULT_TEMPLATE):
+    """
+    Lends out a warm renderer for the template, creating one only when every pooled
+    renderer is busy, and returns it to the pool afterwards.
+    """
+    with _idle_renderers_lock:
+        idle = _idle_renderers.setdefault(template_name, [])
+        renderer = idle.pop() if idle else None
+    if renderer is None:
+        renderer = _new_renderer(template_name)
+    try:
+        yield renderer
+    finally:
+        with _idle_renderers_lock:
+            idle = _idle_renderers.setdefault(template_name, [])
+            if len(idle) < MAX_IDLE_RENDERERS:
+                idle.append(renderer)
+
+def generate_final_pdf(marked_up_tables, config):
+    """
+    Generates a PDF quotation using HTML templates and the marked-up data.
+    Set config["template_name"] to render with a different template from TEMPLATES_DIR.
     """
+    quote_model = build_quote_model(marked_up_tables, config)
     
     try:
-        # Generate the PDF from HTML string using WeasyPrint
-        pdf_bytes = HTML(string=html_content).write_pdf()
-        return pdf_bytes
+        # Generate the PDF with a warm WeasyPrint renderer from the process-wide pool
+        with checkout_renderer(config.get("template_name") or DEFAULT_TEMPLATE) as renderer:
+            return renderer.render(quote_model)
     except Exception as e:
         print(f"Error generating PDF (ensure weasyprint is installed properly): {e}")
         return None
 
-def generate_excel_from_pdf(tables, config, markup_percentage):
+# Currency symbols and thousands separators stripped before numeric conversion
+EXCEL_NUMBER_NOISE = r"[$,€£]"
+
+
+def _excel_column_values(series):
+    """
+    Cleans one extracted column for the Excel export in a single vectorized pass.
+    Returns (values, numeric): cell values (float, "" for blanks, otherwise the
+    stripped text) and a parallel list of flags marking the numeric cells.
+    """
+    import pandas as pd
+
+    text = series.astype(object).where(series.notna(), "").astype(str).str.strip()
+    blank = text.str.lower().isin(("nan", "none", ""))
+    numbers = pd.to_numeric(text.str.replace(EXCEL_NUMBER_NOISE, "", regex=True).str.strip(), errors="coerce")
+    numeric = numbers.notna() & ~blank
+
+    values = text.astype(object).mask(blank, "").mask(numeric, numbers.astype(float).astype(object))
+    return values.tolist(), numeric.tolist()
+
+
+def _styled_cell(ws, value, style_array):
+    from openpyxl.cell import Cell
+
+    # Same as openpyxl's WriteOnlyCell, but copying a resolved style array skips the
+    # per-cell named style lookup
+    return Cell(ws, row=1, column=1, value=value, style_array=copy(style_array))
+
+
+def _named_style_array(ws, name):
+    """
+    Resolves a registered named style once, for reuse by _styled_cell.
+    """
+    from openpyxl.cell import Cell
+
+    cell = Cell(ws)
+    cell.style = name
+    return cell._style
+
+
+# Column auto-fit limits for the Excel export
+EXCEL_MAX_COLUMN_WIDTH = 60
+EXCEL_WIDTH_SAMPLE_ROWS = 2000
+
+
+class ColumnWidths:
+    """
+    Tracks the widest displayed value per column while rows are being prepared, so
+    widths are known before a write-only sheet is streamed and the sheet never has
+    to be re-scanned. Formulas are ignored (their text is not what Excel shows),
+    money cells are measured as formatted, and columns longer than sample_rows are
+    measured on an evenly spaced sample.
+    """
+
+    def __init__(self, max_width=EXCEL_MAX_COLUMN_WIDTH, sample_rows=EXCEL_WIDTH_SAMPLE_ROWS):
+        self.max_width = max_width
+        self.sample_rows = sample_rows
+        self.widths = {}
+
+    @staticmethod
+    def _display_length(value, money):
+        if value is None:
+            return 0
+        if money and isinstance(value, (int, float)):
+            return len(f"{value:,.2f}")
+        text = str(value)
+        return 0 if text.startswith("=") else len(text)
+
+    def observe(self, col_idx, value, money=False):
+        length = self._display_length(value, money)
+        if length > self.widths.get(col_idx, 0):
+            self.widths[col_idx] = length
+
+    def observe_row(self, values, first_col=1):
+        for col_idx, value in enumerate(values, first_col):
+            self.observe(col_idx, value)
+
+    def observe_column(self, col_idx, values, money=False):
+        if self.sample_rows and len(values) > self.sample_rows:
+            values = values[::-(-len(values) // self.sample_rows)]
+        if money:
+            # Format the numbers in one vectorized pass, as '#,##0.00' shows them
+            numeric = [isinstance(v, (int, float)) and not isinstance(v, bool) for v in values]
+            amounts = [v for v, n in zip(values, numeric) if n]
+            values = [v for v, n in zip(values, numeric) if not n] + list(format_money(amounts, symbol=""))
+        for value in values:
+            self.observe(col_idx, value)
+
+    def apply(self, ws):
+        from openpyxl.utils import get_column_letter
+
+        for col_idx, length in self.widths.items():
+            ws.column_dimensions[get_column_letter(col_idx)].width = min(length + 2, self.max_width)
+
+
+def generate_excel_from_pdf(tables, config, markup_percentage,
+                            max_column_width=EXCEL_MAX_COLUMN_WIDTH, width_sample_rows=EXCEL_WIDTH_SAMPLE_ROWS):
     """
     Generates a professional Excel file from PDF extracted tables, 
     injecting live Excel formulas for the markup calculation.
+    The sheet is streamed through a write-only workbook; column widths are
+    capped at max_column_width and sampled from width_sample_rows rows per column.
     """
     import openpyxl
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
     from io import BytesIO
     
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Marked Up Quotation"
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Marked Up Quotation")
+    widths = ColumnWidths(max_column_width, width_sample_rows)
     
     # Styles
     header_font = Font(bold=True, color="FFFFFF")
@@ -343,84 +321,95 @@ def generate_excel_from_pdf(tables, config, markup_percentage):
     title_font = Font(size=16, bold=True)
     bold_font = Font(bold=True)
     
-    # Add Company Details
-    ws.append(["QUOTATION"])
-    ws.cell(row=1, column=1).font = title_font
+    # Thin Border
+    thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
+    
+    # Shared named styles for the bulk-written line items
+    wb.add_named_style(NamedStyle(name="Quote Cell", border=thin_border))
+    wb.add_named_style(NamedStyle(name="Quote Money", border=thin_border, number_format='#,##0.00'))
+    wb.add_named_style(NamedStyle(name="Quote Markup", border=thin_border, number_format='#,##0.00', font=bold_font))
+    cell_style = _named_style_array(ws, "Quote Cell")
+    money_style = _named_style_array(ws, "Quote Money")
+    markup_style = _named_style_array(ws, "Quote Markup")
+    
+    def styled(value, font=None, fill=None, alignment=None, border=None, number_format=None):
+        cell = WriteOnlyCell(ws, value=value)
+        if font is not None:
+            cell.font = font
+        if fill is not None:
+            cell.fill = fill
+        if alignment is not None:
+            cell.alignment = alignment
+        if border is not None:
+            cell.border = border
+        if number_format is not None:
+            cell.number_format = number_format
+        return cell
+    
+    # Rows can only be appended once the column widths are known, so everything is
+    # collected into sections first; line items stay as generators over cleaned columns.
+    sections = []
+    rows = []
+    
+    def add_row(values, labels=()):
+        widths.observe_row(values)
+        rows.append([styled(v, font=bold_font) if i in labels else v for i, v in enumerate(values)])
     
+    # Add Company Details
     current_date = datetime.now().strftime("%B %d, %Y")
-    ws.append([f"Generated: {current_date}"])
-    ws.cell(row=2, column=1).font = Font(italic=True, color="64748B")
+    rows.append([styled("QUOTATION", font=title_font)])
+    rows.append([styled(f"Generated: {current_date}", font=Font(italic=True, color="64748B"))])
+    widths.observe_row(["QUOTATION"])
+    widths.observe_row([f"Generated: {current_date}"])
     
     # Sender details
-    ws.append([])
-    ws.append(["From:", config.get('sender_name', '')])
-    ws.cell(row=4, column=1).font = bold_font
-    current_row = 5
+    rows.append([])
+    add_row(["From:", config.get('sender_name', '')], labels=(0,))
     
     if config.get('sender_phone'):
-        ws.append(["Phone:", config.get('sender_phone', '')])
-        ws.cell(row=current_row, column=1).font = bold_font
-        current_row += 1
+        add_row(["Phone:", config.get('sender_phone', '')], labels=(0,))
         
     if config.get('sender_email'):
-        ws.append(["Email:", config.get('sender_email', '')])
-        ws.cell(row=current_row, column=1).font = bold_font
-        current_row += 1
+        add_row(["Email:", config.get('sender_email', '')], labels=(0,))
         
     if config.get('sender_address'):
-        ws.append(["Address:", ""])
-        ws.cell(row=current_row, column=1).font = bold_font
-        current_row += 1
+        add_row(["Address:", ""], labels=(0,))
         for line in config.get('sender_address').split('\n'):
             if line.strip():
-                ws.append(["", line])
-                current_row += 1
+                add_row(["", line])
                 
-    ws.append([])
-    current_row += 1
+    rows.append([])
     
     # Recipient details
-    ws.append(["To:", config.get('recipient_name', '')])
-    ws.cell(row=current_row, column=1).font = bold_font
-    current_row += 1
+    add_row(["To:", config.get('recipient_name', '')], labels=(0,))
     
     if config.get('recipient_contact'):
-        ws.append(["Contact:", config.get('recipient_contact', '')])
-        ws.cell(row=current_row, column=1).font = bold_font
-        current_row += 1
+        add_row(["Contact:", config.get('recipient_contact', '')], labels=(0,))
         
     if config.get('recipient_address'):
-        ws.append(["Address:", ""])
-        ws.cell(row=current_row, column=1).font = bold_font
-        current_row += 1
+        add_row(["Address:", ""], labels=(0,))
         for line in config.get('recipient_address').split('\n'):
             if line.strip():
-                ws.append(["", line])
-                current_row += 1
+                add_row(["", line])
                 
-    ws.append([])
-    current_row += 1
+    rows.append([])
     
     if config.get('job_description'):
-        ws.append(["Job Description/Notes:"])
-        ws.cell(row=current_row, column=1).font = bold_font
-        current_row += 1
+        add_row(["Job Description/Notes:"], labels=(0,))
         
         # Split by newlines so it can print nicely, or just dump into a single cell
         for line in str(config.get('job_description')).splitlines():
-            ws.append([line])
-            current_row += 1
+            add_row([line])
             
-        ws.append([])
-        current_row += 1
+        rows.append([])
     
+    sections.append(rows)
+    current_row = len(rows) + 1
     multiplier = 1 + (markup_percentage / 100)
     
-    # Thin Border
-    thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
-    
     sum_ranges = []
     last_markup_col_idx = 1
+    marked_up_total = 0.0
     
     for df in tables:
         # We need the original columns 
@@ -432,60 +421,52 @@ def generate_excel_from_pdf(tables, config, markup_percentage):
             has_added_total = True
             
         # Write Headers
-        for col_idx, col_name in enumerate(columns, 1):
-            cell = ws.cell(row=current_row, column=col_idx, value=col_name)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = Alignment(horizontal="center")
-            cell.border = thin_border
+        widths.observe_row(columns)
+        sections.append([[
+            styled(col_name, font=header_font, fill=header_fill, alignment=Alignment(horizontal="center"), border=thin_border)
+            for col_name in columns
+        ]])
             
         current_row += 1
         start_data_row = current_row
         
         # Write Data
-        for _, row in df.iterrows():
-            for col_idx, col_name in enumerate(df.columns, 1):
-                val = str(row[col_name]).strip()
-                
-                # Try to clean and convert every cell to float if it looks like a number.
-                # This ensures Excel formulas work regardless of which column has numbers.
-                if val.lower() in ('nan', 'none', ''):
-                    cell = ws.cell(row=current_row, column=col_idx, value="")
-                else:
-                    try:
-                        # Strip currency, commas, spaces
-                        clean_str = val.replace('$', '').replace(',', '').replace('€', '').replace('£', '').strip()
-                        clean_val = float(clean_str)
-                        cell = ws.cell(row=current_row, column=col_idx, value=clean_val)
-                        # Optionally apply number formatting only if it's the last original column to avoid formatting quantities as currency
-                        if col_idx == len(df.columns):
-                            cell.number_format = '#,##0.00'
-                    except ValueError:
-                        cell = ws.cell(row=current_row, column=col_idx, value=val)
-                        
-                cell.border = thin_border
-                
-            if has_added_total:
-                # Add the Excel Formula representing: Original Column * Multiplier
-                # We point to the last original column (len(df.columns))
-                orig_col_idx = len(df.columns)
-                orig_col_letter = openpyxl.utils.get_column_letter(orig_col_idx)
-                new_col_letter = openpyxl.utils.get_column_letter(orig_col_idx + 1)
-                
-                # We need to make sure the targeted cell is actually numeric, otherwise `=C2*1.1` will be #VALUE!
-                # We check the cell value that was just written. If it's a string, we just output blank or 0 to be safe.
-                target_cell_value = ws.cell(row=current_row, column=orig_col_idx).value
-                if isinstance(target_cell_value, (int, float)):
-                    formula = f"={orig_col_letter}{current_row}*{multiplier}"
-                else:
-                    formula = 0 # Fallback if someone put pure text in the price column
-                    
-                cell = ws.cell(row=current_row, column=orig_col_idx + 1, value=formula)
-                cell.number_format = '#,##0.00'
-                cell.font = bold_font
-                cell.border = thin_border
-                
-            current_row += 1
+        # Every column is cleaned once up front; rows are then appended as prebuilt cells
+        # sharing the workbook's named styles instead of styling cells one at a time.
+        columns_values = []
+        columns_styles = []
+        for col_idx in range(len(df.columns)):
+            values, numeric = _excel_column_values(df.iloc[:, col_idx])
+            columns_values.append(values)
+            # Only the last original column gets currency formatting, so quantities stay plain
+            is_last = col_idx == len(df.columns) - 1
+            widths.observe_column(col_idx + 1, values, money=is_last)
+            if is_last:
+                columns_styles.append([money_style if n else cell_style for n in numeric])
+            else:
+                columns_styles.append([cell_style] * len(values))
+
+        orig_col_idx = len(df.columns)
+        if has_added_total and orig_col_idx:
+            # Add the Excel Formula representing: Original Column * Multiplier
+            # Text in the last original column would make `=C2*1.1` evaluate to #VALUE!,
+            # so those rows fall back to 0.
+            orig_col_letter = openpyxl.utils.get_column_letter(orig_col_idx)
+            columns_values.append([
+                f"={orig_col_letter}{row_idx}*{multiplier}" if is_numeric else 0
+                for row_idx, is_numeric in enumerate(numeric, start_data_row)
+            ])
+            columns_styles.append([markup_style] * len(df))
+            # The formulas are measured by the values Excel will display for them
+            marked_up = [v * multiplier for v, n in zip(columns_values[orig_col_idx - 1], numeric) if n]
+            widths.observe_column(orig_col_idx + 1, marked_up, money=True)
+            marked_up_total += sum(marked_up)
+
+        sections.append(
+            [_styled_cell(ws, value, style) for value, style in zip(row_values, row_styles)]
+            for row_values, row_styles in zip(zip(*columns_values), zip(*columns_styles))
+        )
+        current_row += len(df)
             
         end_data_row = current_row - 1
         
@@ -494,17 +475,25 @@ def generate_excel_from_pdf(tables, config, markup_percentage):
             sum_ranges.append(f"{markup_col_letter}{start_data_row}:{markup_col_letter}{end_data_row}")
             last_markup_col_idx = len(df.columns) + 1
             
-        current_row += 2 # Space between tables
+        sections.append([[], []]) # Space between tables
+        current_row += 2
         
     # Generate the Totals Rows
     if sum_ranges:
+        rows = []
+        label_col_idx = last_markup_col_idx - 1
+        padding = [None] * (label_col_idx - 1)
+        
+        def add_total_row(label, value, **value_style):
+            widths.observe(label_col_idx, label)
+            rows.append(padding + [styled(label, font=bold_font), styled(value, **value_style)])
+        
+        money_total = {"font": bold_font, "border": thin_border, "number_format": '#,##0.00'}
+        
         subtotal_row_idx = current_row
-        ws.cell(row=current_row, column=last_markup_col_idx - 1, value="SUBTOTAL").font = bold_font
         subtotal_formula = f"=SUM({','.join(sum_ranges)})"
-        cell = ws.cell(row=current_row, column=last_markup_col_idx, value=subtotal_formula)
-        cell.number_format = '#,##0.00'
-        cell.font = bold_font
-        cell.border = thin_border
+        add_total_row("SUBTOTAL", subtotal_formula, **money_total)
+        widths.observe(last_markup_col_idx, marked_up_total, money=True)
         current_row += 1
         
         discount_flat = config.get('discount_flat', 0.0)
@@ -512,18 +501,17 @@ def generate_excel_from_pdf(tables, config, markup_percentage):
         
         # Keep track of which rows to add/subtract for Grand Total
         gt_components = [f"{col_letter}{subtotal_row_idx}"]
+        estimated_total = marked_up_total
         
         if discount_flat > 0:
             disc_row_idx = current_row
-            ws.cell(row=current_row, column=last_markup_col_idx - 1, value="DISCOUNT").font = bold_font
             # We insert it as a negative number literal
-            cell = ws.cell(row=current_row, column=last_markup_col_idx, value=-discount_flat)
-            cell.number_format = '#,##0.00'
-            cell.font = Font(color="FF0000", bold=True)
-            cell.border = thin_border
+            add_total_row("DISCOUNT", -discount_flat, font=Font(color="FF0000", bold=True), border=thin_border, number_format='#,##0.00')
+            widths.observe(last_markup_col_idx, -discount_flat, money=True)
             current_row += 1
             # Since the discount cell is negative, we still ADD it to the grand total formula
             gt_components.append(f"{col_letter}{disc_row_idx}")
+            estimated_total = max(0.0, estimated_total - discount_flat)
             
             # The calculation base for tax is (Subtotal + Discount) where Discount is negative
             tax_base_val = f"MAX(0, {col_letter}{subtotal_row_idx}+{col_letter}{disc_row_idx})"
@@ -536,48 +524,31 @@ def generate_excel_from_pdf(tables, config, markup_percentage):
         
         if tax_type == 'percentage' and sales_tax_pct > 0:
             tax_row_idx = current_row
-            ws.cell(row=current_row, column=last_markup_col_idx - 1, value=f"SALES TAX ({sales_tax_pct}%)").font = bold_font
             tax_formula = f"={tax_base_val}*({sales_tax_pct}/100)"
-            cell = ws.cell(row=current_row, column=last_markup_col_idx, value=tax_formula)
-            cell.number_format = '#,##0.00'
-            cell.font = bold_font
-            cell.border = thin_border
+            add_total_row(f"SALES TAX ({sales_tax_pct}%)", tax_formula, **money_total)
             current_row += 1
             gt_components.append(f"{col_letter}{tax_row_idx}")
+            estimated_total *= 1 + sales_tax_pct / 100
             
         elif tax_type == 'flat' and sales_tax_flat > 0:
             tax_row_idx = current_row
-            ws.cell(row=current_row, column=last_markup_col_idx - 1, value="SALES TAX (Flat)").font = bold_font
-            cell = ws.cell(row=current_row, column=last_markup_col_idx, value=sales_tax_flat)
-            cell.number_format = '#,##0.00'
-            cell.font = bold_font
-            cell.border = thin_border
+            add_total_row("SALES TAX (Flat)", sales_tax_flat, **money_total)
+            widths.observe(last_markup_col_idx, sales_tax_flat, money=True)
             current_row += 1
             gt_components.append(f"{col_letter}{tax_row_idx}")
+            estimated_total += sales_tax_flat
             
-        ws.cell(row=current_row, column=last_markup_col_idx - 1, value="GRAND TOTAL").font = bold_font
-        
         gt_formula = f"={' + '.join(gt_components)}"
-            
-        cell = ws.cell(row=current_row, column=last_markup_col_idx, value=gt_formula)
-        cell.number_format = '#,##0.00'
-        cell.font = bold_font
-        cell.border = thin_border
-        cell.fill = header_fill
-        cell.font = Font(bold=True, color="FFFFFF")
-        current_row += 2
+        add_total_row("GRAND TOTAL", gt_formula, font=Font(bold=True, color="FFFFFF"), fill=header_fill,
+                      border=thin_border, number_format='#,##0.00')
+        widths.observe(last_markup_col_idx, estimated_total, money=True)
+        sections.append(rows)
         
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter 
-        for cell in col:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 2)
-        ws.column_dimensions[column].width = adjusted_width
+    # Widths have to be in place before the first row is streamed
+    widths.apply(ws)
+    for section in sections:
+        for row in section:
+            ws.append(row)
 
     output = BytesIO()
     wb.save(output)
@@ -0,0 +1,71 @@
+import base64
+from functools import lru_cache
+from io import BytesIO
+from math import ceil
+
+# Images in generated PDFs never need more detail than this, even in print
+PDF_IMAGE_DPI = 200
+JPEG_QUALITY = 85
+
+# CSS pixels are defined as 1/96 of an inch
+CSS_PX_PER_INCH = 96
+
+# The quotation templates show the company logo at most this many CSS pixels tall
+LOGO_RENDER_HEIGHT = 80
+
+
+def target_pixels(css_px, dpi=PDF_IMAGE_DPI):
+    """
+    Number of image pixels needed to fill css_px CSS pixels at dpi.
+    """
+    return ceil(css_px * dpi / CSS_PX_PER_INCH)
+
+
+def optimize_image(data, max_height, jpeg_quality=JPEG_QUALITY):
+    """
+    Resamples an image to at most max_height pixels tall and re-encodes it: PNG when
+    it has transparency, JPEG otherwise. The EXIF orientation is applied first. PNG and
+    JPEG files that are already small enough and upright, or that would not get any
+    smaller, are returned unchanged.
+    Returns: (image_bytes, mime_type).
+    """
+    from PIL import ExifTags, Image, ImageOps
+
+    with Image.open(BytesIO(data)) as image:
+        fmt = image.format
+        # Phone photos are often stored sideways with an EXIF orientation tag, which
+        # is lost on re-encoding, so the pixels are turned upright first
+        rotated = image.getexif().get(ExifTags.Base.Orientation, 1) != 1
+        if rotated:
+            image = ImageOps.exif_transpose(image)
+        keep_original = fmt in ("PNG", "JPEG") and not rotated
+        if keep_original and image.height <= max_height:
+            return data, Image.MIME[fmt]
+
+        image.thumbnail((image.width, max_height), Image.LANCZOS)
+        buf = BytesIO()
+        if image.mode in ("RGBA", "LA", "P"):
+            image.save(buf, format="PNG", optimize=True)
+            mime_type = "image/png"
+        else:
+            image.convert("RGB").save(buf, format="JPEG", quality=jpeg_quality, optimize=True)
+            mime_type = "image/jpeg"
+
+    if keep_original and buf.tell() >= len(data):
+        return data, Image.MIME[fmt]
+    return buf.getvalue(), mime_type
+
+
+@lru_cache(maxsize=32)
+def optimized_data_uri(image_base64, mime_type, css_height, dpi=PDF_IMAGE_DPI, jpeg_quality=JPEG_QUALITY):
+    """
+    Returns a data: URI for a base64 image shown css_height CSS pixels tall,
+    resampled to dpi. Cached, since the same logo is embedded in quote after quote.
+    Images Pillow can't read are passed through as they are.
+    """
+    try:
+        data, mime_type = optimize_image(base64.b64decode(image_base64), target_pixels(css_height, dpi), jpeg_quality)
+    except Exception as e:
+        print(f"Could not optimize image, embedding it unchanged: {e}")
+        return f"data:{mime_type};base64,{image_base64}"
+    return f"data:{mime_type};base64,{base64.b64encode(data).decode()}"
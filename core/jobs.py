@@ -0,0 +1,174 @@
+import hashlib
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from core.extractor import stream_pdf_data
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class ExtractionJob:
+    """
+    A single background PDF extraction, keyed by the submitting session and the file hash.
+    Rows are published as they stream in so the page can show partial results while polling;
+    once the extraction finishes, the stitched table replaces them as the result.
+    """
+
+    def __init__(self, session_id, file_hash, file_name=None):
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.file_hash = file_hash
+        self.file_name = file_name
+        self.status = QUEUED
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._batches = []
+        self._final = None
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    @property
+    def rows_extracted(self):
+        with self._lock:
+            return sum(len(batch) for batch in self._batches)
+
+    def add_batch(self, batch):
+        with self._lock:
+            self._batches.append(batch)
+
+    def set_result(self, table):
+        with self._lock:
+            self._final = table
+
+    def partial_table(self):
+        """
+        Returns the rows extracted so far as one DataFrame, or None if nothing has arrived yet.
+        """
+        with self._lock:
+            batches = list(self._batches)
+        return pd.concat(batches, ignore_index=True) if batches else None
+
+    def result(self):
+        """
+        Returns the extracted tables in the same shape as extract_pdf_data: the stitched
+        table once the job is done, the rows streamed so far before that.
+        """
+        with self._lock:
+            table = self._final
+        if table is None and self.status != DONE:
+            table = self.partial_table()
+        return [table] if table is not None and not table.empty else []
+
+
+class JobManager:
+    """
+    Runs PDF extractions on a bounded thread pool so Streamlit script runs never wait
+    on the LLM round trip. Jobs are keyed by (session_id, file_hash); resubmitting the
+    same file from the same session returns the existing job unless force_refresh is set.
+    """
+
+    def __init__(self, max_workers=4, finished_ttl_seconds=3600):
+        self.finished_ttl_seconds = finished_ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="quoter-extract")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def file_hash(file_bytes):
+        return hashlib.sha256(file_bytes).hexdigest()
+
+    def submit(self, session_id, file_bytes, file_name=None, force_refresh=False):
+        """
+        Queues an extraction of file_bytes for the session and returns its job.
+        """
+        key = (session_id, self.file_hash(file_bytes))
+        with self._lock:
+            self._prune()
+            job = self._jobs.get(key)
+            if job is not None and not force_refresh and job.status != FAILED:
+                return job
+            job = ExtractionJob(session_id, key[1], file_name)
+            self._jobs[key] = job
+        self._executor.submit(self._run, job, file_bytes, force_refresh)
+        return job
+
+    def get(self, session_id, file_bytes=None, file_hash=None):
+        """
+        Returns the session's job for the file, or None if there is none.
+        """
+        if file_hash is None:
+            file_hash = self.file_hash(file_bytes)
+        with self._lock:
+            return self._jobs.get((session_id, file_hash))
+
+    def discard(self, job):
+        """
+        Forgets a job once the page has picked up its result.
+        """
+        with self._lock:
+            if self._jobs.get((job.session_id, job.file_hash)) is job:
+                del self._jobs[(job.session_id, job.file_hash)]
+
+    def discard_session(self, session_id):
+        with self._lock:
+            for key in [key for key in self._jobs if key[0] == session_id]:
+                del self._jobs[key]
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {status: sum(1 for job in jobs if job.status == status) for status in (QUEUED, RUNNING, DONE, FAILED)}
+
+    def _prune(self):
+        # Results nobody came back for (closed tabs) must not pile up forever
+        cutoff = time.time() - self.finished_ttl_seconds
+        for key, job in list(self._jobs.items()):
+            if job.finished and job.finished_at < cutoff:
+                del self._jobs[key]
+
+    def _run(self, job, file_bytes, force_refresh):
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            stream = stream_pdf_data(file_bytes, force_refresh=force_refresh)
+            while True:
+                try:
+                    job.add_batch(next(stream))
+                except StopIteration as stop:
+                    # The generator returns the stitched table the cache also gets
+                    job.set_result(stop.value)
+                    break
+            job.status = DONE
+        except Exception as e:
+            print(f"Extraction job {job.id} failed: {e}")
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """
+    Returns the process-wide job manager shared by all Streamlit sessions.
+    """
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = JobManager()
+        return _job_manager
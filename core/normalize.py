@@ -0,0 +1,118 @@
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+CANONICAL_COLUMNS = ("Description", "Quantity", "Unit Price", "Total")
+
+# First matching rule wins, so "Total Price" maps to Total rather than Unit Price
+HEADER_RULES = (
+    (("total", "amount"), "Total"),
+    (("price", "unit", "cost"), "Unit Price"),
+    (("qty", "quant"), "Quantity"),
+    (("desc", "item"), "Description"),
+)
+
+# Everything except digits, the decimal point and the minus sign is dropped before parsing
+MONEY_NOISE = r"[^\d\.\-]"
+
+NUMERIC_COLUMNS = ("Quantity", "Unit Price", "Total")
+
+# Labels of the subtotal, tax, discount, shipping and total rows that follow the line items
+SUMMARY_LABEL = re.compile(
+    r"^\s*(?:sub[\s-]?total|grand\s+total|total|(?:sales\s+)?tax|vat|gst|discount|shipping"
+    r"|freight|delivery|handling|balance|amount\s+due)\b",
+    re.IGNORECASE,
+)
+
+
+def is_summary_label(value):
+    """
+    True if value labels a summary row ("Subtotal", "Tax 12.5%", "Grand Total:")
+    rather than a line item.
+    """
+    return isinstance(value, str) and SUMMARY_LABEL.match(value) is not None
+
+
+def canonical_column(header):
+    cl = str(header).lower()
+    for keywords, name in HEADER_RULES:
+        if any(keyword in cl for keyword in keywords):
+            return name
+    return None
+
+
+@lru_cache(maxsize=512)
+def header_plan(headers):
+    """
+    Compiles a tuple of raw headers into (positions, names): which columns to keep,
+    in output order, and what to call them. Recognised columns are renamed to the
+    canonical layout and everything else is dropped; if nothing is recognised all
+    columns are kept as they are. Cached per header tuple, since extracted tables
+    from the same supplier tend to repeat the same headers.
+    """
+    mapped = [(pos, canonical_column(header)) for pos, header in enumerate(headers)]
+    kept = [(pos, name) for pos, name in mapped if name is not None]
+    if not kept:
+        kept = list(enumerate(headers))
+
+    # Drop duplicated column names, keeping the first occurrence
+    seen = set()
+    unique = []
+    for pos, name in kept:
+        if name not in seen:
+            seen.add(name)
+            unique.append((pos, name))
+
+    # Canonical columns first, in their natural order
+    rank = {name: i for i, name in enumerate(CANONICAL_COLUMNS)}
+    unique.sort(key=lambda item: rank.get(item[1], len(rank)))
+    return tuple(pos for pos, _ in unique), tuple(name for _, name in unique)
+
+
+def parse_money(series):
+    """
+    Parses a column of money-like cells ("$1,234.50", "1 200", 500) into a float
+    array in one vectorized pass; cells that aren't numbers become NaN.
+    """
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series.to_numpy(dtype=float, na_value=np.nan)
+    clean = series.astype(str).str.replace(MONEY_NOISE, "", regex=True)
+    return pd.to_numeric(clean, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+
+def normalize_table(df):
+    """
+    Normalizes one extracted table to the Description/Quantity/Unit Price/Total layout
+    and recalculates Total as Quantity × Unit Price.
+    Returns: (norm_df, numbers) where numbers maps each numeric canonical column to
+    its parsed float array, so later stages never have to parse the strings again.
+    """
+    positions, names = header_plan(tuple(df.columns))
+    norm_df = df.iloc[:, list(positions)].copy()
+    norm_df.columns = list(names)
+
+    numbers = {col: parse_money(norm_df[col]) for col in NUMERIC_COLUMNS if col in norm_df.columns}
+
+    # Calculate Total dynamically
+    if "Quantity" in numbers and "Unit Price" in numbers:
+        q = np.nan_to_num(numbers["Quantity"], nan=1.0)
+        p = np.nan_to_num(numbers["Unit Price"], nan=0.0)
+        calc_total = q * p
+
+        if "Total" in numbers:
+            user_total = np.nan_to_num(numbers["Total"], nan=0.0)
+            calc_total = np.where(calc_total != 0, calc_total, user_total)
+        norm_df["Total"] = calc_total
+        numbers["Total"] = calc_total
+
+    return norm_df, numbers
+
+
+def normalize_tables(tables):
+    """
+    Renames columns to the canonical Description/Quantity/Unit Price/Total layout,
+    drops unrecognised columns and recalculates Total as Quantity × Unit Price.
+    """
+    return [normalize_table(df)[0] for df in tables]
@@ -0,0 +1,58 @@
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+# Only the first few pages are rasterized; the full document is a download away
+PREVIEW_PAGES = 3
+PREVIEW_WIDTH = 900
+MAX_CACHED_PREVIEWS = 64
+
+_previews = OrderedDict()
+_previews_lock = threading.Lock()
+
+
+def render_thumbnails(pdf_bytes, max_pages=PREVIEW_PAGES, width=PREVIEW_WIDTH):
+    """
+    Rasterizes the first max_pages pages of a PDF to PNGs width pixels wide.
+    Returns: (png_pages, page_count) where page_count is the length of the whole document.
+    """
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(pdf_bytes)
+    try:
+        page_count = len(pdf)
+        png_pages = []
+        for index in range(min(max_pages, page_count)):
+            page = pdf[index]
+            try:
+                image = page.render(scale=width / page.get_width()).to_pil()
+            finally:
+                page.close()
+            buf = BytesIO()
+            image.save(buf, format="PNG", optimize=True)
+            png_pages.append(buf.getvalue())
+        return png_pages, page_count
+    finally:
+        pdf.close()
+
+
+def pdf_preview(digest, load_pdf, max_pages=PREVIEW_PAGES, width=PREVIEW_WIDTH):
+    """
+    Returns render_thumbnails() for the PDF identified by digest (a hash of its
+    bytes), rendering them only the first time that document is previewed in this
+    process. load_pdf is called to fetch the PDF bytes on a miss.
+    """
+    key = (digest, max_pages, width)
+    with _previews_lock:
+        cached = _previews.get(key)
+        if cached is not None:
+            _previews.move_to_end(key)
+            return cached
+
+    preview = render_thumbnails(load_pdf(), max_pages, width)
+
+    with _previews_lock:
+        _previews[key] = preview
+        while len(_previews) > MAX_CACHED_PREVIEWS:
+            _previews.popitem(last=False)
+    return preview
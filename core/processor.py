@@ -1,61 +1,258 @@
 import openpyxl
-import pandas as pd
+from copy import copy
 from io import BytesIO
 
-def apply_markup_to_excel(wb, markup_percentage):
+from core.normalize import is_summary_label, normalize_table
+from core.quote import MONEY_KEYWORDS, QuoteTable, cents_to_float, round_half_up, to_cents
+# Currency formatting shared by the PDF and Excel generators
+from core.quote import CURRENCY_FORMATS, format_currency, format_money
+
+EXCEL_MARKUP_MODES = ("formula", "value")
+
+
+def _is_markup_header(row_values):
+    """
+    A header row holds only text labels (no numbers or formulas, at least two of
+    them) and at least one money keyword; returns the 0-based indexes of the
+    keyword columns, or None if the row is not a header. Requiring plain labels
+    keeps rows like "Subtotal | =SUM(...)" from being mistaken for headers.
+    """
+    targets = []
+    labels = 0
+    for idx, value in enumerate(row_values):
+        if value is None or value == "":
+            continue
+        if not isinstance(value, str) or value.startswith("="):
+            return None
+        labels += 1
+        if any(keyword in value.lower() for keyword in MONEY_KEYWORDS):
+            targets.append(idx)
+    return targets if targets and labels >= 2 else None
+
+
+def _sheet_layout(src_ws):
+    """
+    Reads the column widths and merged ranges of a read-only worksheet, which
+    iter_rows() never sees, straight from the sheet XML. Rows are discarded as soon
+    as they are parsed, so this takes no more memory than the streaming copy.
+    Returns: (columns, merged) where columns holds (min, max, width, hidden) tuples
+    and merged the A1 references of the merged ranges.
+    """
+    from openpyxl.xml.constants import SHEET_MAIN_NS
+    from openpyxl.xml.functions import iterparse
+
+    sheet_data_tag = f"{{{SHEET_MAIN_NS}}}sheetData"
+    row_tag = f"{{{SHEET_MAIN_NS}}}row"
+    col_tag = f"{{{SHEET_MAIN_NS}}}col"
+    merge_tag = f"{{{SHEET_MAIN_NS}}}mergeCell"
+
+    columns = []
+    merged = []
+    sheet_data = None
+    with src_ws._get_source() as source:
+        for event, element in iterparse(source, events=("start", "end")):
+            if event == "start":
+                if element.tag == sheet_data_tag:
+                    sheet_data = element
+                continue
+            if element.tag == row_tag and sheet_data is not None:
+                sheet_data.clear()
+            elif element.tag == col_tag:
+                width = element.get("width")
+                columns.append((int(element.get("min")), int(element.get("max")),
+                                float(width) if width else None, element.get("hidden") in ("1", "true")))
+            elif element.tag == merge_tag:
+                merged.append(element.get("ref"))
+    return columns, merged
+
+
+def _touched_ranges(sheet_title, touched_rows):
+    """
+    Collapses {column index: [row numbers]} into A1 ranges like 'Sheet1'!D5:D40.
     """
-    Applies the markup to the provided openpyxl workbook.
+    from openpyxl.utils import get_column_letter, quote_sheetname
+
+    ranges = []
+    for col_idx, rows in sorted(touched_rows.items()):
+        letter = get_column_letter(col_idx)
+        start = prev = rows[0]
+        for row in rows[1:] + [None]:
+            if row is not None and row == prev + 1:
+                prev = row
+                continue
+            ref = f"{letter}{start}" if start == prev else f"{letter}{start}:{letter}{prev}"
+            ranges.append(f"{quote_sheetname(sheet_title)}!{ref}")
+            if row is not None:
+                start = prev = row
+    return ranges
+
+
+def apply_markup_to_excel(file_bytes, markup_percentage, mode="formula"):
     """
+    Applies the markup to an uploaded Excel workbook in one streaming pass.
+    Each sheet is read row by row (read-only) and written straight to a write-only
+    workbook, so large supplier files are never fully held in memory. Columns whose
+    header mentions price/total/cost/amount are marked up: numeric cells become
+    =orig*multiplier formulas (mode="formula") or the marked-up value (mode="value").
+    Existing formulas are kept as they are, since they recalculate from the
+    marked-up inputs. Summary rows (a subtotal, tax, discount, shipping or total
+    label, see core.normalize.is_summary_label, with a single amount) are left alone. Cell values, styles,
+    column widths and merged cells are copied; images and charts are not.
+    Returns: (xlsx_bytes, touched_ranges) with ranges like 'Sheet1'!D5:D40.
+    """
+    from openpyxl.cell import Cell
+    from openpyxl.utils import get_column_letter
+    from openpyxl.worksheet.dimensions import ColumnDimension
+
+    if mode not in EXCEL_MARKUP_MODES:
+        raise ValueError(f"Unknown markup mode '{mode}'. Expected one of: {', '.join(EXCEL_MARKUP_MODES)}")
     multiplier = 1 + (markup_percentage / 100)
-    
-    # Example logic: This assumes we are modifying a specific sheet/cell
-    # In a real scenario, the user would need to configure which column/rows to target.
-    # For now, this is a placeholder structure to represent formula injection.
-    
-    # We will need more sophisticated logic to find the 'Total' column dynamically.
-    
+
+    src = openpyxl.load_workbook(filename=BytesIO(file_bytes), read_only=True, data_only=False)
+    out = openpyxl.Workbook(write_only=True)
+    touched_ranges = []
+
+    try:
+        for src_ws in src.worksheets:
+            ws = out.create_sheet(src_ws.title)
+            # Column widths have to be in place before the first row is written
+            columns, merged = _sheet_layout(src_ws)
+            for col_min, col_max, width, hidden in columns:
+                letter = get_column_letter(col_min)
+                dimension = ColumnDimension(ws, index=letter, width=width, customWidth=width is not None, hidden=hidden)
+                dimension.min, dimension.max = col_min, col_max
+                ws.column_dimensions[letter] = dimension
+            for ref in merged:
+                ws.merged_cells.add(ref)
+            # Source style ids resolve to the same style array in the output workbook
+            styles = {}
+            targets = set()
+            touched_rows = {}
+
+            # Starting at A1 keeps every cell at its original coordinates; gaps come
+            # back as empty cells
+            for row_idx, row in enumerate(src_ws.iter_rows(min_row=1, min_col=1), 1):
+                values = [cell.value for cell in row]
+                header_targets = _is_markup_header(values)
+                if header_targets is not None:
+                    targets = set(header_targets)
+                # A summary row is a keyword label with a single amount; line items
+                # such as "Tax bracket | 1 | 5 | 5" carry a quantity and prices too
+                label = next((value for value in values if isinstance(value, str) and value.strip()), None)
+                amounts = sum(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values)
+                mark_up = header_targets is None and not (is_summary_label(label) and amounts <= 1)
+
+                out_row = []
+                for col_idx, cell in enumerate(row):
+                    value = cell.value
+                    if value is None and not getattr(cell, "has_style", False):
+                        out_row.append(None)
+                        continue
+                    if (mark_up and col_idx in targets
+                            and isinstance(value, (int, float)) and not isinstance(value, bool)):
+                        value = f"={value}*{multiplier}" if mode == "formula" else value * multiplier
+                        touched_rows.setdefault(col_idx + 1, []).append(row_idx)
+
+                    style_id = cell._style_id
+                    if not style_id:
+                        # Unstyled cells go in as plain values, the write-only fast path
+                        out_row.append(value)
+                        continue
+                    if style_id not in styles:
+                        proto = Cell(ws)
+                        proto.font = cell.font
+                        proto.fill = cell.fill
+                        proto.border = cell.border
+                        proto.alignment = cell.alignment
+                        proto.protection = cell.protection
+                        proto.number_format = cell.number_format
+                        styles[style_id] = proto._style
+                    out_row.append(Cell(ws, row=1, column=1, value=value, style_array=copy(styles[style_id])))
+                ws.append(out_row)
+
+            touched_ranges.extend(_touched_ranges(src_ws.title, touched_rows))
+    finally:
+        src.close()
+
     # Save the modified workbook to a BytesIO object for download
     output = BytesIO()
-    wb.save(output)
+    out.save(output)
     output.seek(0)
-    return output.read()
+    return output.read(), touched_ranges
 
 def apply_markup_to_data(tables, markup_percentage):
     """
     Applies markup to extracted PDF table data (DataFrames).
+    Returns DataFrames with the marked-up money columns formatted for display.
     """
     multiplier = 1 + (markup_percentage / 100)
-    marked_up_tables = []
+    return [QuoteTable.from_frame(df, multiplier=multiplier).display_frame() for df in tables]
+
+def calculate_quote_totals(marked_up_tables, config, markup_percentage):
+    """
+    Computes subtotal, discount, tax, markup and grand total over the marked-up tables.
+    All arithmetic is done in integer cents so totals don't drift; the returned
+    calc_* values are those cent amounts as floats.
+    Returns: A dict of the calc_* values the generators read from config.
+    """
+    # Calculate Subtotal over all tables using the guaranteed "Total" column
+    subtotal = 0
+    for mt in marked_up_tables:
+        if not isinstance(mt, QuoteTable):
+            mt = QuoteTable.from_frame(mt)
+        subtotal += mt.total_cents()
+    return totals_from_subtotal(subtotal, config, markup_percentage)
+
+def totals_from_subtotal(subtotal, config, markup_percentage):
+    """
+    Computes discount, tax, markup and grand total from a marked-up subtotal in cents.
+    Returns: A dict of the calc_* values the generators read from config.
+    """
+    running_total = subtotal
+    discount_val = int(to_cents([config.get("discount_flat", 0.0)])[0])
+    running_total -= discount_val
+    if running_total < 0: running_total = 0
     
-    for df in tables:
-        df_copy = df.copy()
+    tax_amount = 0
+    sales_tax_percentage = config.get("sales_tax_percentage", 0.0)
+    sales_tax_flat = config.get("sales_tax_flat", 0.0)
+    if config.get("tax_type") == "percentage" and sales_tax_percentage > 0:
+        tax_amount = int(round_half_up(running_total * (sales_tax_percentage / 100.0)))
+    elif config.get("tax_type") == "flat" and sales_tax_flat > 0:
+        tax_amount = int(to_cents([sales_tax_flat])[0])
         
-        # We find columns that are "Price", "Cost", "Total", "Amount"
-        for col in df_copy.columns:
-            cl = str(col).lower()
-            if any(keyword in cl for keyword in ['price', 'total', 'cost', 'amount']):
-                try:
-                    original_col = df_copy[col].copy()
-                    
-                    # Strip currency symbols, commas, spaces
-                    clean_str = original_col.astype(str).str.replace(r'[^\d\.\-]', '', regex=True)
-                    # Safely convert to numeric, turning bad parse values into NaNs
-                    numeric_col = pd.to_numeric(clean_str, errors='coerce')
-                    
-                    # Apply markup to only the valid numeric rows (NaN stays NaN)
-                    marked_up = numeric_col * multiplier
-                    
-                    # Format as two decimal places currency string
-                    formatted_col = marked_up.apply(lambda x: f"${x:,.2f}" if not pd.isna(x) else None)
-                    
-                    # Stitch it back: if formatted_col is None (meaning it wasn't numeric), use the original value
-                    df_copy[col] = formatted_col.combine_first(original_col)
-                    
-                except Exception as e:
-                    # If conversion fails completely (e.g., column doesn't exist), skip gracefully
-                    print(f"Markup application failed on col {col}: {e}")
-                    pass
-            
-        marked_up_tables.append(df_copy)
+    running_total += tax_amount
+    grand_total = running_total
+    
+    markup_amount = 0
+    if markup_percentage > 0:
+        multiplier = 1 + (markup_percentage / 100.0)
+        base_subtotal = int(round_half_up(subtotal / multiplier))
+        markup_amount = subtotal - base_subtotal
         
-    return marked_up_tables
+    return {
+        "calc_subtotal": cents_to_float(subtotal),
+        "calc_discount": cents_to_float(discount_val),
+        "calc_tax": cents_to_float(tax_amount),
+        "calc_markup": cents_to_float(markup_amount),
+        "calc_grand_total": cents_to_float(grand_total),
+        "markup_percentage": markup_percentage,
+    }
+
+def prepare_quote(tables, config, markup_percentage):
+    """
+    Runs the full pricing pipeline on edited/extracted tables: normalize, apply markup
+    and compute totals. Money columns are parsed once during normalization and kept
+    as integer cents from then on; they are only formatted when the quote is rendered.
+    Returns: (quote_tables, config) where quote_tables are core.quote.QuoteTable objects
+    and config is a copy extended with the calc_* values.
+    """
+    multiplier = 1 + (markup_percentage / 100)
+    quote_tables = []
+    for df in tables:
+        norm_df, numbers = normalize_table(df)
+        quote_tables.append(QuoteTable.from_frame(norm_df, numbers, multiplier))
+    
+    quote_config = dict(config)
+    quote_config.update(calculate_quote_totals(quote_tables, config, markup_percentage))
+    return quote_tables, quote_config
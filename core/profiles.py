@@ -0,0 +1,113 @@
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from core.images import LOGO_RENDER_HEIGHT, optimize_image, target_pixels
+
+DEFAULT_PROFILE_DB = os.environ.get("QUOTER_PROFILE_DB", os.path.join(".tmp", "profiles.sqlite3"))
+
+# Settings a company profile remembers; anything else in the quote config is per quotation
+PROFILE_FIELDS = (
+    "sender_name",
+    "sender_email",
+    "sender_phone",
+    "sender_address",
+    "signature_name",
+    "markup_percentage",
+    "discount_flat",
+    "tax_type",
+    "sales_tax_percentage",
+    "sales_tax_flat",
+)
+
+def prepare_logo(data):
+    """
+    Resamples an uploaded logo to what the template needs at PDF_IMAGE_DPI, so no
+    full-resolution upload is stored or embedded.
+    Returns: (image_bytes, mime_type).
+    """
+    return optimize_image(data, target_pixels(LOGO_RENDER_HEIGHT))
+
+
+class ProfileStore:
+    """
+    Saved company profiles (sender details, pricing defaults and a prepared logo),
+    kept in SQLite and scoped to the owning user's email.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or DEFAULT_PROFILE_DB
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS profiles (
+                    owner TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    settings TEXT NOT NULL,
+                    logo BLOB,
+                    logo_mime TEXT,
+                    updated REAL NOT NULL,
+                    PRIMARY KEY (owner, name)
+                )
+                """
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def load_all(self, owner):
+        """
+        Returns {name: profile} for the owner. Each profile holds the PROFILE_FIELDS
+        that were saved plus logo_base64/logo_mime, ready to merge into a quote config.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT name, settings, logo, logo_mime FROM profiles WHERE owner = ? ORDER BY name", (owner,)
+            ).fetchall()
+        profiles = {}
+        for name, settings, logo, logo_mime in rows:
+            profile = json.loads(settings)
+            profile["logo_base64"] = base64.b64encode(logo).decode() if logo else None
+            profile["logo_mime"] = logo_mime or "image/png"
+            profiles[name] = profile
+        return profiles
+
+    def save(self, owner, name, settings, logo=None, logo_mime=None):
+        """
+        Creates or replaces a profile. settings may be a whole quote config; only
+        PROFILE_FIELDS are kept. logo should already have gone through prepare_logo.
+        """
+        name = (name or "").strip()
+        if not name:
+            raise ValueError("Please enter a name for the profile.")
+        kept = {field: settings[field] for field in PROFILE_FIELDS if field in settings}
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO profiles (owner, name, settings, logo, logo_mime, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                (owner, name, json.dumps(kept), sqlite3.Binary(logo) if logo else None, logo_mime, time.time()),
+            )
+
+    def delete(self, owner, name):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM profiles WHERE owner = ? AND name = ?", (owner, name))
+
+
+_profile_store = None
+_profile_store_lock = threading.Lock()
+
+
+def get_profile_store():
+    """
+    Returns the process-wide profile store, creating it on first use.
+    """
+    global _profile_store
+    with _profile_store_lock:
+        if _profile_store is None:
+            _profile_store = ProfileStore()
+        return _profile_store
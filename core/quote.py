@@ -0,0 +1,208 @@
+import numpy as np
+import pandas as pd
+
+from core.normalize import parse_money
+
+# Header keywords marking the columns that carry money
+MONEY_KEYWORDS = ('price', 'total', 'cost', 'amount')
+
+
+def is_money_column(header):
+    cl = str(header).lower()
+    return any(keyword in cl for keyword in MONEY_KEYWORDS)
+
+
+def round_half_up(values):
+    """
+    Rounds to the nearest integer with halves going away from zero, the usual rule
+    for money. Tiny binary representation noise (100.49999999999999) is removed first.
+    """
+    values = np.round(np.asarray(values, dtype=float), 6)
+    return np.sign(values) * np.floor(np.abs(values) + 0.5)
+
+
+def to_cents(amounts):
+    """
+    Converts dollar amounts (floats, NaN for missing) to a nullable Int64 cents array.
+    """
+    amounts = np.asarray(amounts, dtype=float)
+    missing = np.isnan(amounts)
+    cents = round_half_up(np.where(missing, 0.0, amounts) * 100).astype(np.int64)
+    return pd.arrays.IntegerArray(cents, missing)
+
+
+def scale_cents(cents, factor):
+    """
+    Multiplies an Int64 cents array by factor, rounding back to whole cents.
+    """
+    missing = np.asarray(cents.isna())
+    values = cents.to_numpy(dtype=float, na_value=0.0) * factor
+    return pd.arrays.IntegerArray(round_half_up(values).astype(np.int64), missing)
+
+
+# Presets for format_currency: (symbol, thousands separator, decimal separator, symbol after amount)
+CURRENCY_FORMATS = {
+    "en_US": ("$", ",", ".", False),
+    "en_GB": ("£", ",", ".", False),
+    "en_IE": ("€", ",", ".", False),
+    "de_DE": ("€", ".", ",", True),
+    "fr_FR": ("€", "\u202f", ",", True),
+}
+DEFAULT_CURRENCY_LOCALE = "en_US"
+
+
+# Powers of ten for counting the digits of whole-dollar amounts
+_POW10 = 10 ** np.arange(19, dtype=np.int64)
+
+
+def _currency_layout(n_digits, negative, symbol, thousands, decimal, symbol_after):
+    """
+    Builds the character layout shared by every amount with the same digit count and
+    sign, e.g. "-$#,###.##", where each # is a digit slot.
+    """
+    int_part = ""
+    for k in range(n_digits):
+        if k and k % 3 == 0:
+            int_part = thousands + int_part
+        int_part = "#" + int_part
+    amount = int_part + decimal + "##"
+    if symbol_after:
+        text = amount + (f"\u00a0{symbol}" if symbol else "")
+    else:
+        text = symbol + amount
+    return ("-" if negative else "") + text
+
+
+def format_currency(cents, locale=None, symbol=None, thousands=None, decimal=None, symbol_after=None):
+    """
+    Formats an array of integer cents as currency strings without per-element Python
+    formatting. locale picks a CURRENCY_FORMATS preset and the keyword arguments
+    override parts of it, e.g. symbol="R" for rand. Missing values (NA in an Int64
+    array) come back as None.
+    Returns: an object array of strings such as "$1,234.56" or "1.234,56 €".
+    """
+    preset = CURRENCY_FORMATS[locale or DEFAULT_CURRENCY_LOCALE]
+    symbol = preset[0] if symbol is None else symbol
+    thousands = preset[1] if thousands is None else thousands
+    decimal = preset[2] if decimal is None else decimal
+    symbol_after = preset[3] if symbol_after is None else symbol_after
+
+    if isinstance(cents, (pd.Series, pd.api.extensions.ExtensionArray)):
+        missing = np.asarray(pd.isna(cents))
+        values = np.asarray(pd.array(cents).fillna(0), dtype=np.int64)
+    else:
+        values = np.asarray(cents, dtype=np.int64)
+        missing = np.zeros(len(values), dtype=bool)
+
+    dollars, fraction = np.divmod(np.abs(values), 100)
+    n_digits = np.maximum(1, np.searchsorted(_POW10, dollars, side="right"))
+    group_keys = n_digits * 2 + (values < 0)
+    out = np.empty(len(values), dtype=object)
+
+    # Amounts with the same digit count and sign share one layout, so every character
+    # position is fixed within the group and is filled a whole column at a time.
+    # The filled code point matrix is then viewed as fixed-width unicode strings.
+    for key in np.unique(group_keys):
+        n, negative = divmod(int(key), 2)
+        selected = group_keys == key
+        layout = _currency_layout(n, negative, symbol, thousands, decimal, symbol_after)
+        chars = np.empty((int(selected.sum()), len(layout)), dtype=np.uint32)
+        chars[:] = [ord(ch) for ch in layout]
+        slots = [i for i, ch in enumerate(layout) if ch == "#"]
+
+        rest = dollars[selected]
+        tens, ones = np.divmod(fraction[selected], 10)
+        chars[:, slots[-1]] = 48 + ones
+        chars[:, slots[-2]] = 48 + tens
+        for slot in reversed(slots[:-2]):
+            rest, digit = np.divmod(rest, 10)
+            chars[:, slot] = 48 + digit
+        out[selected] = chars.view(f"U{len(layout)}").ravel()
+
+    out[missing] = None
+    return out
+
+
+def format_money(amounts, **options):
+    """
+    Formats dollar amounts (floats, NaN for missing) via format_currency.
+    """
+    return format_currency(to_cents(amounts), **options)
+
+
+def currency_options(config):
+    """
+    Reads the optional currency_locale/currency_symbol quote settings into
+    format_currency keyword arguments.
+    """
+    options = {}
+    if config.get("currency_locale"):
+        options["locale"] = config["currency_locale"]
+    if config.get("currency_symbol") is not None:
+        options["symbol"] = config["currency_symbol"]
+    return options
+
+
+def format_cents(cents, **options):
+    """
+    Formats a single cents amount, e.g. "$1,234.56"; see format_currency for options.
+    """
+    return format_currency([int(cents)], **options)[0]
+
+
+def cents_to_float(cents):
+    return int(cents) / 100
+
+
+class QuoteTable:
+    """
+    One quote table with its money columns held as integer cents.
+    frame keeps the cells as entered; cents maps each money column to an Int64 array
+    that is NA where the cell isn't a number (those cells keep their text). Amounts
+    are only turned into "$1,234.56" strings by display_frame(), at render time.
+    """
+
+    def __init__(self, frame, cents):
+        self.frame = frame
+        self.cents = cents
+
+    @classmethod
+    def from_frame(cls, df, numbers=None, multiplier=1.0):
+        """
+        Builds a table from a DataFrame, applying multiplier to every money column.
+        numbers optionally maps columns to already-parsed float arrays (see
+        core.normalize.normalize_table); other money columns are parsed here, once.
+        """
+        cents = {}
+        for col in df.columns:
+            if not is_money_column(col):
+                continue
+            parsed = numbers.get(col) if numbers else None
+            if parsed is None:
+                parsed = parse_money(df[col])
+            cents[col] = scale_cents(to_cents(parsed), multiplier)
+        return cls(df, cents)
+
+    @property
+    def columns(self):
+        return self.frame.columns
+
+    def __len__(self):
+        return len(self.frame)
+
+    def total_cents(self):
+        if "Total" not in self.cents:
+            return 0
+        return int(self.cents["Total"].sum())
+
+    def display_frame(self, **currency):
+        """
+        Returns the table as display strings: money columns formatted (currency takes
+        the format_currency options), and cells that aren't numbers left as entered.
+        Missing cells become "".
+        """
+        df = self.frame.astype(object)
+        for col, cents in self.cents.items():
+            formatted = pd.Series(format_currency(cents, **currency), index=df.index, dtype=object)
+            df[col] = formatted.combine_first(df[col])
+        return df.fillna("")
@@ -0,0 +1,185 @@
+import os
+import atexit
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+DEFAULT_SESSION_DIR = os.environ.get("QUOTER_SESSION_DIR", os.path.join(".tmp", "sessions"))
+
+
+class SessionArtifactStore:
+    """
+    Keeps per-session generated files (PDFs, workbooks) on local disk so that
+    st.session_state only has to hold small string handles. Every blob belongs to a
+    session; storing a new one evicts that session's oldest blobs once it is over
+    max_session_bytes, then the oldest blobs of any session once the store is over
+    max_total_bytes. Sessions that haven't been seen for idle_ttl_seconds are
+    dropped entirely. get() returns None for evicted handles, so callers must be
+    able to rebuild what they stored.
+    Blobs live in a private directory created under root for this store alone, which
+    is removed again when the process exits; nothing else under root is touched.
+    """
+
+    def __init__(self, root=None, max_session_bytes=50 * 1024 * 1024, max_total_bytes=500 * 1024 * 1024,
+                 idle_ttl_seconds=3600, sweep_interval_seconds=60):
+        os.makedirs(root or DEFAULT_SESSION_DIR, exist_ok=True)
+        self.root = tempfile.mkdtemp(prefix="quoter-", dir=root or DEFAULT_SESSION_DIR)
+        self.max_session_bytes = max_session_bytes
+        self.max_total_bytes = max_total_bytes
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self.evictions = 0
+        self._blobs = OrderedDict()  # handle -> (session_id, path, size), oldest first
+        self._last_seen = {}
+        self._last_sweep = time.time()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def put(self, session_id, data, name="blob"):
+        """
+        Writes data to disk for the session.
+        Returns: the handle to keep in session state.
+        """
+        handle = f"{name}-{uuid.uuid4().hex}"
+        path = os.path.join(self.root, handle)
+        with open(path, "wb") as f:
+            f.write(data)
+
+        with self._lock:
+            self._blobs[handle] = (session_id, path, len(data))
+            self._total_bytes += len(data)
+            self._last_seen[session_id] = time.time()
+
+            # The blob just stored is never evicted by its own put
+            session_bytes = sum(size for owner, _, size in self._blobs.values() if owner == session_id)
+            for old, (owner, _, size) in list(self._blobs.items()):
+                if session_bytes <= self.max_session_bytes:
+                    break
+                if owner == session_id and old != handle:
+                    self._remove(old)
+                    session_bytes -= size
+            for old in list(self._blobs):
+                if self._total_bytes <= self.max_total_bytes:
+                    break
+                if old != handle:
+                    self._remove(old)
+        self._maybe_sweep()
+        return handle
+
+    def has(self, handle):
+        with self._lock:
+            return handle in self._blobs
+
+    def path(self, handle):
+        """
+        Returns the file holding the blob, or None if it has been evicted.
+        """
+        with self._lock:
+            entry = self._blobs.get(handle)
+            if entry is None:
+                return None
+            self._blobs.move_to_end(handle)
+            return entry[1]
+
+    def get(self, handle):
+        """
+        Reads the blob back, or returns None if it has been evicted.
+        """
+        path = self.path(handle)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            # Evicted between the lookup and the read
+            return None
+
+    def discard(self, handle):
+        with self._lock:
+            if handle in self._blobs:
+                self._remove(handle, evicted=False)
+
+    def touch(self, session_id):
+        """
+        Marks the session as active; call on every script run. Idle sessions are
+        swept from here too, at most once every sweep_interval_seconds.
+        """
+        with self._lock:
+            self._last_seen[session_id] = time.time()
+        self._maybe_sweep()
+
+    def discard_session(self, session_id):
+        """
+        Drops every blob of the session, e.g. on logout.
+        """
+        with self._lock:
+            self._drop_session(session_id)
+
+    def sweep(self):
+        """
+        Drops the sessions that have been idle longer than idle_ttl_seconds.
+        """
+        cutoff = time.time() - self.idle_ttl_seconds
+        with self._lock:
+            self._last_sweep = time.time()
+            for session_id in [sid for sid, seen in self._last_seen.items() if seen < cutoff]:
+                self._drop_session(session_id, evicted=True)
+
+    def close(self):
+        """
+        Drops every blob and removes the store's private directory.
+        """
+        with self._lock:
+            self._blobs.clear()
+            self._last_seen.clear()
+            self._total_bytes = 0
+            shutil.rmtree(self.root, ignore_errors=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._last_seen),
+                "blobs": len(self._blobs),
+                "bytes": self._total_bytes,
+                "evictions": self.evictions,
+            }
+
+    def _maybe_sweep(self):
+        if time.time() - self._last_sweep >= self.sweep_interval_seconds:
+            self.sweep()
+
+    def _drop_session(self, session_id, evicted=False):
+        # Caller holds the lock
+        for handle in [h for h, (owner, _, _) in self._blobs.items() if owner == session_id]:
+            self._remove(handle, evicted)
+        self._last_seen.pop(session_id, None)
+
+    def _remove(self, handle, evicted=True):
+        # Caller holds the lock
+        _, path, size = self._blobs.pop(handle)
+        self._total_bytes -= size
+        self.evictions += evicted
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+_artifact_store = None
+_artifact_store_lock = threading.Lock()
+
+
+def get_artifact_store():
+    """
+    Returns the process-wide session artifact store, creating it on first use.
+    """
+    global _artifact_store
+    with _artifact_store_lock:
+        if _artifact_store is None:
+            _artifact_store = SessionArtifactStore()
+        return _artifact_store
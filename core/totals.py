@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+from core.normalize import normalize_table
+from core.processor import totals_from_subtotal
+from core.quote import QuoteTable, round_half_up
+
+
+def row_total_cents(frame):
+    """
+    Un-marked-up Total of every row in frame, in cents (0 where there is none),
+    computed exactly the way prepare_quote computes it.
+    """
+    if frame.empty:
+        return np.zeros(0, dtype=np.int64)
+    norm_df, numbers = normalize_table(frame)
+    cents = QuoteTable.from_frame(norm_df, numbers).cents.get("Total")
+    if cents is None:
+        return np.zeros(len(frame), dtype=np.int64)
+    return cents.to_numpy(dtype=np.int64, na_value=0)
+
+
+def _marked_up(cents, multiplier):
+    return round_half_up(cents * multiplier).astype(np.int64)
+
+
+class IncrementalTotals:
+    """
+    Keeps the marked-up subtotal of one table up to date as it is edited in
+    st.data_editor. The editor's state ({"edited_rows", "added_rows", "deleted_rows"},
+    all relative to the table it was given) is compared with the state applied last
+    time, and only rows whose edits changed are recalculated; the subtotal is
+    adjusted by the difference. A markup change rescales every row in one
+    vectorized pass.
+    """
+
+    def __init__(self, base_df, markup_percentage=0.0):
+        # Rows are only ever addressed by position, so the table is used as is, not copied
+        self.source = self.base = base_df
+        self.multiplier = 1 + (markup_percentage / 100)
+        self.rows_recalculated = 0
+
+        self._edited = {}
+        self._added = []
+        self._deleted = set()
+
+        # Per-row Totals before markup (the base rows with their current edits) and after
+        self._cents = row_total_cents(self.base)
+        self._marked = _marked_up(self._cents, self.multiplier)
+        self._added_cents = np.zeros(0, dtype=np.int64)
+        self._added_marked = np.zeros(0, dtype=np.int64)
+        self.subtotal = int(self._marked.sum())
+
+    def set_markup(self, markup_percentage):
+        multiplier = 1 + (markup_percentage / 100)
+        if multiplier == self.multiplier:
+            return
+        self.multiplier = multiplier
+        self._marked = _marked_up(self._cents, multiplier)
+        self._added_marked = _marked_up(self._added_cents, multiplier)
+        active = np.ones(len(self._marked), dtype=bool)
+        active[[pos for pos in self._deleted if pos < len(self.base)]] = False
+        self.subtotal = int(self._marked[active].sum() + self._added_marked.sum())
+
+    def apply_delta(self, delta, markup_percentage=None):
+        """
+        Brings the subtotal in line with the editor state delta.
+        Returns: the marked-up subtotal in cents.
+        """
+        if markup_percentage is not None:
+            self.set_markup(markup_percentage)
+        delta = delta or {}
+        edited = {int(pos): dict(changes) for pos, changes in (delta.get("edited_rows") or {}).items()}
+        added = [dict(row) for row in (delta.get("added_rows") or [])]
+        deleted = {int(pos) for pos in (delta.get("deleted_rows") or [])}
+
+        # Base rows whose edits differ from the last applied state
+        changed = sorted(pos for pos in set(edited) | set(self._edited)
+                         if edited.get(pos) != self._edited.get(pos) and pos < len(self.base))
+        if changed:
+            frame = self.base.iloc[changed].copy()
+            for i, pos in enumerate(changed):
+                for col, value in edited.get(pos, {}).items():
+                    if col in frame.columns:
+                        frame.iloc[i, frame.columns.get_loc(col)] = value
+            cents = row_total_cents(frame)
+            marked = _marked_up(cents, self.multiplier)
+            for pos, new_marked in zip(changed, marked):
+                if pos not in self._deleted:
+                    self.subtotal += int(new_marked) - int(self._marked[pos])
+            self._cents[changed] = cents
+            self._marked[changed] = marked
+            self.rows_recalculated += len(changed)
+
+        # Deleted rows stop (or start again) counting with whatever they currently hold
+        for pos in deleted - self._deleted:
+            if pos < len(self.base):
+                self.subtotal -= int(self._marked[pos])
+        for pos in self._deleted - deleted:
+            if pos < len(self.base):
+                self.subtotal += int(self._marked[pos])
+
+        # Added rows are usually appended one at a time; only the ones that differ are redone
+        redo = [i for i, row in enumerate(added) if i >= len(self._added) or row != self._added[i]]
+        self.subtotal -= int(self._added_marked[len(added):].sum())
+        self._added_cents = np.resize(self._added_cents, len(added))
+        self._added_marked = np.resize(self._added_marked, len(added))
+        if redo:
+            frame = pd.DataFrame([added[i] for i in redo], columns=self.base.columns)
+            cents = row_total_cents(frame)
+            marked = _marked_up(cents, self.multiplier)
+            for i, new_cents, new_marked in zip(redo, cents, marked):
+                previous = int(self._added_marked[i]) if i < len(self._added) else 0
+                self.subtotal += int(new_marked) - previous
+                self._added_cents[i] = new_cents
+                self._added_marked[i] = new_marked
+            self.rows_recalculated += len(redo)
+
+        self._edited, self._added, self._deleted = edited, added, deleted
+        return self.subtotal
+
+
+def live_quote_totals(engines, config, markup_percentage):
+    """
+    Combines the subtotals of several IncrementalTotals into the calc_* values.
+    """
+    subtotal = sum(engine.subtotal for engine in engines)
+    return totals_from_subtotal(subtotal, config, markup_percentage)
@@ -1,5 +1,7 @@
+import numpy as np
 import pandas as pd
 from core.generator import generate_final_pdf
+from core.normalize import normalize_tables, parse_money
 
 # Mock messy data that Gemini might output
 df = pd.DataFrame([{
@@ -9,35 +11,8 @@ df = pd.DataFrame([{
     "Total Price": "$500.00"
 }])
 
-# Same cleaning logic from app.py
-clean_tables = []
-for mt in [df]:
-    rename_map = {}
-    cols_to_keep = []
-    for c in mt.columns:
-        cl = str(c).lower()
-        if 'total' in cl or 'amount' in cl: rename_map[c] = 'Total'
-        elif 'price' in cl or 'unit' in cl or 'cost' in cl: rename_map[c] = 'Unit Price'
-        elif 'qty' in cl or 'quant' in cl: rename_map[c] = 'Quantity'
-        elif 'desc' in cl or 'item' in cl: rename_map[c] = 'Description'
-        
-        if c in rename_map: cols_to_keep.append(c)
-        
-    if not cols_to_keep:
-        cols_to_keep = list(mt.columns)
-        
-    clean_mt = mt[cols_to_keep].copy()
-    clean_mt.rename(columns=rename_map, inplace=True)
-    
-    if len(clean_mt.columns) != len(set(clean_mt.columns)):
-        clean_mt = clean_mt.loc[:, ~clean_mt.columns.duplicated()]
-        
-    final_order = [c for c in ["Description", "Quantity", "Unit Price", "Total"] if c in clean_mt.columns]
-    if final_order:
-        clean_mt = clean_mt[final_order + [c for c in clean_mt.columns if c not in final_order]]
-        
-    clean_mt = clean_mt.fillna("")
-    clean_tables.append(clean_mt)
+# Same cleaning logic the app uses
+clean_tables = [mt.fillna("") for mt in normalize_tables([df])]
 
 print("Cleaned DataFrame:")
 print(clean_tables[0])
@@ -46,7 +21,16 @@ print(clean_tables[0])
 subtotal = 0.0
 for mt in clean_tables:
     if not mt.empty and "Total" in mt.columns:
-        clean_col = mt["Total"].astype(str).str.replace(r'[\$,]', '', regex=True)
-        total_val = pd.to_numeric(clean_col, errors='coerce').fillna(0).sum()
-        subtotal += total_val
+        subtotal += np.nansum(parse_money(mt["Total"]))
 print("Calculated Subtotal:", subtotal)
+
+# Chunks stitched across a page break: identical consecutive line items are kept,
+# a partial row emitted by both chunks is kept once
+from core.extractor import stitch_csv_fragments
+
+first = "Description,Qty,Unit Price,Total\nBolt M8,10,0.50,5.00\nBolt M8,10,0.50,5.00\nCable tray (cont.),,,\n"
+second = "Description,Qty,Unit Price,Total\nCable tray (cont.),,,\nBolt M8,10,0.50,5.00\nNut M8,10,0.20,2.00\n"
+stitched = stitch_csv_fragments([first, second])
+print("Stitched rows:")
+print(stitched)
+assert list(stitched["Description"]) == ["Bolt M8", "Bolt M8", "Cable tray (cont.)", "Bolt M8", "Nut M8"]